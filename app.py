@@ -1,15 +1,53 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session
+from flask import Flask, Response, request, jsonify, render_template, redirect, url_for, session, stream_with_context, g
 from flask_cors import CORS
-from datetime import timedelta
+from datetime import datetime, timedelta
 from functools import wraps
 from dotenv import load_dotenv
 import os
+import io
+import csv
+import json
+import queue
+import atexit
+import time
+import gzip
+import hashlib
+import threading
+import psycopg
+from werkzeug.http import is_resource_modified
 
 from utils.db_utils import (
     init_db,
     insert_health_data,
+    insert_health_data_batch,
+    insert_health_data_columns,
     get_latest_data,
     get_history_data,
+    get_history_columns,
+    get_history_page,
+    get_history_rollup,
+    get_history_since,
+    get_history_cursor,
+    parse_since_cursor,
+    get_training_sessions,
+    get_training_session,
+    get_health_events,
+    open_history_export,
+    create_team,
+    get_team,
+    get_teams,
+    join_team,
+    remove_team_member,
+    get_team_overview,
+    parse_local_time,
+    encode_cursor,
+    decode_cursor,
+    start_partition_maintenance,
+    start_retention_job,
+    PARTITIONING,
+    MAX_PAGE_SIZE,
+    LOCAL_TZ,
+    TEAM_SUMMARY_MINUTES,
 )
 from utils.auth_utils import (
     init_auth_db,
@@ -17,9 +55,34 @@ from utils.auth_utils import (
     authenticate_user,
     get_user_by_token,
     update_password,
-    generate_session_token
+    generate_session_token,
+    revoke_session_token,
+    token_cache_stats,
+    password_hash_stats,
+    PasswordHashBusy,
 )
+from utils.db_pool import pool_stats
+from utils.ingest import (
+    classify_raw,
+    parse_reading,
+    parse_athlete_id,
+    utc_now,
+    decode_readings,
+    WriteBehindBuffer,
+    MAX_BATCH_SIZE,
+    BINARY_CONTENT_TYPE,
+    READING_DTYPE,
+    READING_COLUMNS,
+)
+from utils.realtime import IngestHub, LatestReadings, TeamOverviews, public_reading
 from utils.ai_model import HealthAIModel
+from utils.anomaly import TrendDetector
+from utils import metrics
+
+try:
+    import brotli  # optional: br responses when installed
+except ImportError:
+    brotli = None
 
 # ======================
 # INIT
@@ -27,7 +90,7 @@ from utils.ai_model import HealthAIModel
 load_dotenv()
 
 app = Flask(__name__)
-CORS(app, supports_credentials=True)
+CORS(app, supports_credentials=True, expose_headers=["X-Next-Cursor", "X-Cursor"])
 
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret")
 
@@ -45,6 +108,11 @@ if os.environ.get("DATABASE_URL"):
     init_db()
     init_auth_db()
     print("✅ Databases initialized")
+    if PARTITIONING:
+        start_partition_maintenance()
+    # One process is enough; concurrent runs skip on an advisory lock anyway
+    if os.environ.get("RETENTION_ENABLED") == "1":
+        start_retention_job()
 else:
     print("⚠️ DATABASE_URL not found")
 
@@ -58,18 +126,106 @@ except Exception as e:
     print("⚠️ AI disabled:", e)
     ai_model = None
 
+# ======================
+# REAL-TIME FAN-OUT
+# ======================
+ingest_hub = IngestHub()
+STREAM_KEEPALIVE = 15
+STREAM_RETRY_MS = 5000
+
+# Latest reading + ingest sequence per athlete, kept current by the hub
+latest_readings = LatestReadings(get_latest_data)
+ingest_hub.add_listener(latest_readings.update)
+ingest_hub.add_reset_listener(latest_readings.clear)
+
+# Coach screens: per-team overview, members' latest readings patched at ingest
+team_overviews = TeamOverviews(get_team_overview, ttl=float(os.environ.get("TEAM_OVERVIEW_TTL", 15)))
+ingest_hub.add_listener(team_overviews.update)
+ingest_hub.add_reset_listener(team_overviews.clear)
+
+# Rolling per-athlete statistics for trend detection, fed by every stored reading
+trend_detector = TrendDetector()
+ingest_hub.add_listener(trend_detector.update_reading)
+
+@app.before_request
+def start_ingest_hub():
+    # Idempotent and fork-aware: each worker listens from its first request
+    ingest_hub.start()
+
+# ======================
+# METRICS
+# ======================
+DB_POOL_IN_USE = metrics.gauge("db_pool_connections_in_use", "Pooled connections currently borrowed")
+INGEST_QUEUE_DEPTH = metrics.gauge("ingest_queue_depth", "Readings waiting in the write-behind queue")
+STREAM_CLIENTS = metrics.gauge("stream_clients", "Open /api/stream connections")
+
+def collect_gauges():
+    DB_POOL_IN_USE.set(pool_stats().get("in_use", 0))
+    INGEST_QUEUE_DEPTH.set(ingest_buffer.stats()["queue_depth"] if ingest_buffer else 0)
+    STREAM_CLIENTS.set(ingest_hub.stats()["streams"])
+
+metrics.register_collector(collect_gauges)
+
+@app.before_request
+def start_timer():
+    metrics.start_writer()
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    started = g.pop("started", None)
+    if started is not None and metrics.METRICS_ENABLED:
+        # The rule, not the path, keeps label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - started, route, request.method)
+        metrics.HTTP_REQUESTS.inc(route, request.method, str(response.status_code))
+    return response
+
+# ======================
+# WRITE-BEHIND INGEST (OPT-IN)
+# ======================
+ingest_buffer = None
+if os.environ.get("INGEST_WRITE_BEHIND") == "1":
+    ingest_buffer = WriteBehindBuffer(
+        insert_health_data_batch,
+        max_queue=int(os.environ.get("INGEST_QUEUE_SIZE", 10000)),
+        batch_size=int(os.environ.get("INGEST_FLUSH_SIZE", 500)),
+        flush_interval=float(os.environ.get("INGEST_FLUSH_INTERVAL", 0.5)),
+        # Rows the database refuses are bisected out instead of retried forever
+        data_errors=(ValueError, TypeError, psycopg.DataError, psycopg.IntegrityError),
+    )
+    atexit.register(ingest_buffer.stop)
+    print("✅ Write-behind ingest enabled")
+
+
+def store_reading(athlete_id, hr, temp, pred):
+    """Insert a reading now, or queue it when write-behind is on. False means the queue is full."""
+    if ingest_buffer:
+        return ingest_buffer.submit((
+            athlete_id, hr, temp, utc_now(),
+            bool(pred.get("is_abnormal")), pred.get("alert_message")
+        ))
+
+    insert_health_data(athlete_id, hr, temp, pred)
+    return True
+
 # ======================
 # AUTH DECORATOR
 # ======================
+def request_token():
+    token = session.get("token")
+
+    if not token:
+        auth = request.headers.get("Authorization")
+        if auth and auth.startswith("Bearer "):
+            token = auth.split(" ")[1]
+
+    return token
+
 def login_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        token = session.get("token")
-
-        if not token:
-            auth = request.headers.get("Authorization")
-            if auth and auth.startswith("Bearer "):
-                token = auth.split(" ")[1]
+        token = request_token()
 
         if not token:
             return redirect(url_for("index"))
@@ -98,6 +254,13 @@ def dashboard():
 # ======================
 # AUTH API
 # ======================
+@app.errorhandler(PasswordHashBusy)
+def password_hash_busy(e):
+    # Login burst: shed load fast instead of tying up more request threads
+    response = jsonify(success=False, error=str(e))
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 @app.route("/api/register", methods=["POST"])
 def register():
     data = request.get_json()
@@ -126,6 +289,9 @@ def login():
 
 @app.route("/api/logout", methods=["POST"])
 def logout():
+    token = request_token()
+    if token:
+        revoke_session_token(token)
     session.clear()
     return jsonify(success=True)
 
@@ -156,26 +322,28 @@ def sensor_data():
         "alert_message": "Check readings"
     }
 
-    insert_health_data(athlete_id, hr, temp, pred)
+    if not store_reading(athlete_id, hr, temp, pred):
+        return jsonify(success=False, error="ingest queue full"), 503
     return jsonify(success=True, data=pred)
 
 # 🔥 ESP32 ENDPOINT (NO AUTH)
 @app.route("/api/sensor-data-raw", methods=["POST"])
 def sensor_data_raw():
+    if request.mimetype == BINARY_CONTENT_TYPE:
+        return ingest_binary()
+
     try:
         data = request.get_json(force=True)
 
         hr = float(data.get("heart_rate", 0))
         temp = float(data.get("temperature", 0))
-        athlete_id = int(data.get("athlete_id", 1))
+        athlete_id = parse_athlete_id(data.get("athlete_id", 1))
         alert = data.get("alert_message", "OK")
 
-        pred = {
-            "is_abnormal": hr == 0 or temp < 30 or temp > 37.5,
-            "alert_message": alert
-        }
+        pred = classify_raw(hr, temp, alert)
 
-        insert_health_data(athlete_id, hr, temp, pred)
+        if not store_reading(athlete_id, hr, temp, pred):
+            return jsonify(success=False, error="ingest queue full"), 503
 
         return jsonify(success=True), 200
 
@@ -183,24 +351,532 @@ def sensor_data_raw():
         print("❌ ESP32 ERROR:", e)
         return jsonify(success=False, error=str(e)), 400
 
+def classify_batch(parsed):
+    """
+    Classify parsed batch readings with one vectorized model call.
+    A device-supplied alert_message is kept; otherwise the model's is used.
+    """
+    if not parsed:
+        return []
+    if not ai_model:
+        return [classify_raw(hr, temp, alert) for _, _, hr, temp, _, alert in parsed]
+
+    _, _, hrs, temps, _, alerts = zip(*parsed)
+    batch = ai_model.predict_batch(hrs, temps)
+    return [
+        {
+            "is_abnormal": abnormal,
+            "alert_message": alert if alert not in (None, "", "OK") else message
+        }
+        for abnormal, message, alert in zip(batch["is_abnormal"], batch["alert_message"], alerts)
+    ]
+
+def ingest_binary():
+    """
+    Store a BINARY_CONTENT_TYPE payload (fixed 24-byte records, see
+    utils/ingest.py). Records are decoded as whole columns and go straight
+    into one bulk insert; the reply only lists rejected record indexes.
+    """
+    if (request.content_length or 0) > MAX_BATCH_SIZE * READING_DTYPE.itemsize:
+        return jsonify(success=False, error=f"batch exceeds {MAX_BATCH_SIZE} readings"), 413
+
+    try:
+        columns, rejected = decode_readings(request.get_data(cache=False))
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    columns = [columns[name] for name in READING_COLUMNS]
+    accepted = len(columns[0])
+
+    if ingest_buffer:
+        for i, row in enumerate(zip(*columns)):
+            if not ingest_buffer.submit(row):
+                accepted = i
+                break
+        if not accepted and columns[0]:
+            return jsonify(success=False, error="ingest queue full"), 503
+    else:
+        try:
+            stored = insert_health_data_columns(*columns)
+        except Exception as e:
+            print("❌ ESP32 BINARY ERROR:", e)
+            stored = False
+
+        if stored is False:
+            return jsonify(success=False, error="readings could not be stored"), 503
+
+    return jsonify(success=True, accepted=accepted, rejected=rejected), 200
+
+# 🔥 ESP32 BATCH ENDPOINT (NO AUTH)
+@app.route("/api/sensor-data-batch", methods=["POST"])
+def sensor_data_batch():
+    if request.mimetype == BINARY_CONTENT_TYPE:
+        return ingest_binary()
+
+    data = request.get_json(force=True, silent=True)
+
+    if isinstance(data, dict):
+        readings = data.get("readings")
+        default_athlete_id = data.get("athlete_id", 1)
+    else:
+        readings = data
+        default_athlete_id = 1
+
+    if not isinstance(readings, list) or not readings:
+        return jsonify(success=False, error="expected a non-empty list of readings"), 400
+    if len(readings) > MAX_BATCH_SIZE:
+        return jsonify(success=False, error=f"batch exceeds {MAX_BATCH_SIZE} readings"), 413
+
+    parsed, results = [], [None] * len(readings)
+    for i, item in enumerate(readings):
+        try:
+            parsed.append((i,) + parse_reading(item, default_athlete_id))
+        except (ValueError, TypeError, KeyError) as e:
+            results[i] = {"index": i, "status": "rejected", "error": str(e)}
+
+    preds = classify_batch(parsed)
+
+    rows = []
+    for (i, athlete_id, hr, temp, ts, alert), pred in zip(parsed, preds):
+        row = (athlete_id, hr, temp, ts or utc_now(), bool(pred["is_abnormal"]), pred["alert_message"])
+
+        try:
+            if ingest_buffer and not ingest_buffer.submit(row):
+                results[i] = {"index": i, "status": "rejected", "error": "ingest queue full"}
+                continue
+        except (ValueError, TypeError) as e:
+            results[i] = {"index": i, "status": "rejected", "error": str(e)}
+            continue
+
+        rows.append(row)
+        results[i] = {"index": i, "status": "queued" if ingest_buffer else "accepted"}
+
+    if ingest_buffer:
+        if not rows and any(r.get("error") == "ingest queue full" for r in results):
+            return jsonify(success=False, error="ingest queue full", results=results), 503
+    else:
+        try:
+            stored = insert_health_data_batch(rows)
+        except Exception as e:
+            print("❌ ESP32 BATCH ERROR:", e)
+            stored = False
+
+        if stored is False:
+            return jsonify(success=False, error="readings could not be stored"), 503
+
+    return jsonify(
+        success=True,
+        accepted=len(rows),
+        rejected=len(readings) - len(rows),
+        results=results
+    ), 200
+
 
 # ======================
 # DATA FOR GRAPHS
 # ======================
+def live_cache():
+    """True when this worker's hub is listening, i.e. cached entries are current."""
+    return ingest_hub.connected
+
+def conditional(response, etag, last_modified=None):
+    """Attach validators; answers 304 when the client's copy is current."""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+# ======================
+# RESPONSE COMPRESSION
+# ======================
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+COMPRESS_ENCODINGS = (["br"] if brotli else []) + ["gzip"]
+
+@app.after_request
+def compress_response(response):
+    """gzip (or br) JSON bodies the client accepts; history windows shrink 4-5x."""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype != "application/json" or "Content-Encoding" in response.headers):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    encoding = request.accept_encodings.best_match(COMPRESS_ENCODINGS)
+    if len(data) < COMPRESS_MIN_SIZE or not encoding:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(data, COMPRESS_LEVEL, mtime=0))
+    response.headers["Content-Encoding"] = encoding
+
+    # Encoded bytes differ from the identity body: validators become weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
 @app.route("/api/latest-data")
 @login_required
 def latest_data():
-    return jsonify(get_latest_data(request.current_user["id"]) or {})
+    athlete_id = request.current_user["id"]
+    reading = latest_readings.get(athlete_id) if live_cache() else get_latest_data(athlete_id)
+    if not reading:
+        return jsonify({})
+
+    return conditional(
+        jsonify(reading),
+        f"l{athlete_id}-{reading['id']}",
+        datetime.fromisoformat(reading["timestamp"]).replace(tzinfo=LOCAL_TZ)
+    )
+
+RESOLUTION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# ?format=columns: {"t": [epoch ms], "hr": [...], "temp": [...], "abn": [...]}
+HISTORY_FORMATS = ("rows", "columns")
+
+def parse_resolution(value):
+    """'300', '5m', '1h', '1d' -> seconds."""
+    if not value:
+        return None
+    unit = RESOLUTION_UNITS.get(value[-1].lower())
+    return int(value[:-1]) * unit if unit else int(value)
+
+def history_validators(athlete_id):
+    """
+    (etag, last_modified) for this history request, or None when the
+    cache is not live. The ETag covers the athlete's ingest sequence and
+    the query; rolling windows (no `to`) also roll it every minute.
+    """
+    if not live_cache():
+        return None
+
+    entry = latest_readings.entry(athlete_id)
+    key = f"{athlete_id}:{entry['seq']}:{request.query_string.decode()}"
+    if not request.args.get("to"):
+        key += f":{int(time.time() // 60)}"
+    return "h" + hashlib.sha1(key.encode()).hexdigest()[:20], entry["modified"]
 
 @app.route("/api/history")
 @login_required
 def history():
-    return jsonify(get_history_data(request.current_user["id"]))
+    athlete_id = request.current_user["id"]
+
+    # Deltas are never revalidated: a replayed delta would duplicate rows
+    validators = None if request.args.get("since") else history_validators(athlete_id)
+    if validators:
+        etag, last_modified = validators
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            return conditional(app.response_class(), etag, last_modified)
+
+    response = history_response(athlete_id)
+    if validators and not isinstance(response, tuple):
+        response = conditional(response, *validators)
+    return response
+
+def history_response(athlete_id):
+    hours = max(1, request.args.get("hours", 24, type=int))
+    points = request.args.get("points", type=int)
+    limit = request.args.get("limit", type=int)
+
+    try:
+        start = parse_local_time(request.args.get("from"))
+        end = parse_local_time(request.args.get("to"))
+        cursor = decode_cursor(request.args.get("cursor"))
+        resolution = parse_resolution(request.args.get("resolution"))
+        since = request.args.get("since") or None
+        if since is not None:
+            parse_since_cursor(since)
+        history_format = request.args.get("format", "rows")
+        if history_format not in HISTORY_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(HISTORY_FORMATS)}")
+        if history_format == "columns" and (since is not None or resolution or limit or cursor):
+            raise ValueError("format=columns only applies to plain history windows")
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    # Delta mode: only rows stored after the client's X-Cursor
+    if since is not None:
+        rows, next_cursor = get_history_since(athlete_id, since, hours, limit or MAX_PAGE_SIZE)
+        response = jsonify(rows)
+        response.headers["X-Cursor"] = next_cursor or since
+        return response
+
+    if resolution:
+        rows = get_history_rollup(athlete_id, resolution, hours, start, end)
+        if rows is not None:
+            return jsonify(rows)
+
+    if limit or cursor:
+        rows, next_cursor = get_history_page(athlete_id, hours, start, end, limit or 1000, cursor)
+        response = jsonify(rows)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
+
+    # Live windows hand out a cursor for later ?since= deltas
+    cursor = get_history_cursor() if end is None else None
+    if history_format == "columns":
+        # Serialized by PostgreSQL; passed through untouched
+        body = get_history_columns(athlete_id, hours, points=points, start=start, end=end)
+        if body is None:
+            return jsonify(success=False, error="history unavailable"), 503
+        response = app.response_class(body, mimetype="application/json")
+    else:
+        response = jsonify(get_history_data(athlete_id, hours, points=points, start=start, end=end))
+    if cursor:
+        response.headers["X-Cursor"] = cursor
+    return response
+
+# ======================
+# HISTORY EXPORT (STREAMED)
+# ======================
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FIELDS = ("cursor", "timestamp", "heart_rate", "temperature", "is_abnormal", "alert_message")
+
+# Each running export holds a pooled connection until the download ends
+EXPORT_MAX_CONCURRENT = int(os.environ.get("EXPORT_MAX_CONCURRENT", 2))
+export_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
+
+def export_chunks(export, export_format):
+    """
+    Encode HistoryExport batches, one chunk per batch. Every row carries
+    the cursor that resumes the export right after it.
+    """
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        yield buffer.getvalue()
+
+    for batch in export:
+        if export_format == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                (encode_cursor(raw_ts, row_id), ts.isoformat(), hr, temp, abnormal, alert)
+                for row_id, raw_ts, ts, hr, temp, abnormal, alert in batch
+            )
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                json.dumps({
+                    "cursor": encode_cursor(raw_ts, row_id),
+                    "timestamp": ts.isoformat(),
+                    "heart_rate": None if hr is None else float(hr),
+                    "temperature": None if temp is None else float(temp),
+                    "is_abnormal": abnormal,
+                    "alert_message": alert,
+                }) + "\n"
+                for row_id, raw_ts, ts, hr, temp, abnormal, alert in batch
+            )
+
+@app.route("/api/export")
+@login_required
+def export_history():
+    """
+    The athlete's raw readings as a download, streamed from a server-side
+    cursor: ?format=ndjson|csv, optional from/to (Philippine time) and
+    cursor (from any exported row) to resume an interrupted download.
+    """
+    athlete_id = request.current_user["id"]
+    export_format = request.args.get("format", "ndjson")
+
+    try:
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        start = parse_local_time(request.args.get("from"))
+        end = parse_local_time(request.args.get("to"))
+        cursor = decode_cursor(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    if not export_slots.acquire(blocking=False):
+        response = jsonify(success=False, error="too many exports running, retry shortly")
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+    export = open_history_export(athlete_id, start, end, cursor)
+    if export is None:
+        export_slots.release()
+        return jsonify(success=False, error="export unavailable"), 503
+
+    response = Response(export_chunks(export, export_format), mimetype=EXPORT_FORMATS[export_format])
+    # Runs when the download finishes or the client goes away
+    response.call_on_close(export.close)
+    response.call_on_close(export_slots.release)
+    response.headers["Content-Disposition"] = f"attachment; filename=athlete-{athlete_id}-history.{export_format}"
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@app.route("/api/sessions")
+@login_required
+def sessions():
+    days = max(1, request.args.get("days", 30, type=int))
+    limit = request.args.get("limit", 50, type=int)
+    return jsonify(get_training_sessions(request.current_user["id"], days, limit))
+
+@app.route("/api/sessions/<int:session_id>")
+@login_required
+def session_detail(session_id):
+    """One session's summary and readings (downsampled to `points`, default 500)."""
+    athlete_id = request.current_user["id"]
+    found = get_training_session(athlete_id, session_id)
+    if not found:
+        return jsonify(success=False, error="session not found"), 404
+
+    summary, (start, end) = found
+    points = request.args.get("points", 500, type=int)
+    # History windows are end-exclusive; include the session's last reading
+    summary["readings"] = get_history_data(athlete_id, points=points, start=start, end=end + timedelta(microseconds=1))
+    return jsonify(summary)
+
+EVENT_SEVERITIES = ("warning", "critical")
+
+@app.route("/api/abnormal-events")
+@login_required
+def abnormal_events():
+    """Abnormal readings, newest first; follow X-Next-Cursor for older pages."""
+    hours = max(1, request.args.get("hours", 168, type=int))
+    limit = request.args.get("limit", 50, type=int)
+    severity = request.args.get("severity")
+
+    try:
+        if severity and severity not in EVENT_SEVERITIES:
+            raise ValueError(f"severity must be one of {', '.join(EVENT_SEVERITIES)}")
+        start = parse_local_time(request.args.get("from"))
+        end = parse_local_time(request.args.get("to"))
+        cursor = decode_cursor(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+
+    events, next_cursor = get_health_events(
+        request.current_user["id"], hours, start, end, severity, limit, cursor
+    )
+    response = jsonify(events)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+# ======================
+# TEAMS (COACH VIEW)
+# ======================
+@app.route("/api/teams", methods=["GET", "POST"])
+@login_required
+def teams():
+    user_id = request.current_user["id"]
+    if request.method == "GET":
+        return jsonify(get_teams(user_id))
+
+    name = ((request.get_json(silent=True) or {}).get("name") or "").strip()
+    if not name:
+        return jsonify(success=False, error="name is required"), 400
+
+    team = create_team(user_id, name[:100])
+    if not team:
+        return jsonify(success=False), 503
+    return jsonify(team), 201
+
+@app.route("/api/teams/join", methods=["POST"])
+@login_required
+def teams_join():
+    code = (request.get_json(silent=True) or {}).get("code")
+    team = join_team(request.current_user["id"], code) if code else None
+    if not team:
+        return jsonify(success=False, error="unknown join code"), 404
+
+    team_overviews.invalidate(team["id"])
+    return jsonify(team)
+
+@app.route("/api/teams/<int:team_id>/members/<int:athlete_id>", methods=["DELETE"])
+@login_required
+def team_member_remove(team_id, athlete_id):
+    if not remove_team_member(team_id, athlete_id, request.current_user["id"]):
+        return jsonify(success=False), 404
+
+    team_overviews.invalidate(team_id)
+    return jsonify(success=True)
+
+@app.route("/api/teams/<int:team_id>/overview")
+@login_required
+def team_overview(team_id):
+    """
+    Latest reading and rolling summary (?minutes=, default 60) for every
+    athlete on the team, coach only. One request per refresh for the
+    whole squad; polls within the cache TTL are served from memory.
+    """
+    team = get_team(team_id)
+    if not team or team["coach_id"] != request.current_user["id"]:
+        return jsonify(success=False, error="team not found"), 404
+
+    minutes = max(1, min(request.args.get("minutes", TEAM_SUMMARY_MINUTES, type=int), 1440))
+    athletes = team_overviews.get(team_id, minutes) if live_cache() else get_team_overview(team_id, minutes)
+    if athletes is None:
+        return jsonify(success=False, error="overview unavailable"), 503
+
+    response = jsonify(team={"id": team["id"], "name": team["name"]}, minutes=minutes, athletes=athletes)
+    # Content-derived, so it holds across workers whose caches differ
+    return conditional(response, "t" + hashlib.sha1(response.get_data()).hexdigest()[:20])
+
+@app.route("/api/trends")
+@login_required
+def trends():
+    """Rolling statistics and active trend flags for the current athlete."""
+    return jsonify(trend_detector.state(request.current_user["id"]) or {})
+
+@app.route("/api/stream")
+@login_required
+def stream():
+    """Server-Sent Events: one `reading` event per new reading of this athlete."""
+    athlete_id = request.current_user["id"]
+    readings = ingest_hub.subscribe(athlete_id)
+
+    def events():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while True:
+                try:
+                    reading = readings.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {reading['id']}\nevent: reading\ndata: {json.dumps(public_reading(reading))}\n\n"
+        finally:
+            ingest_hub.unsubscribe(athlete_id, readings)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.route("/api/health")
 def health():
     return jsonify(status="ok")
 
+@app.route("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition, summed over every worker's snapshot."""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/stats")
+def stats():
+    return jsonify(
+        db_pool=pool_stats(),
+        auth_cache=token_cache_stats(),
+        password_hash=password_hash_stats(),
+        stream=ingest_hub.stats(),
+        latest_cache=latest_readings.stats(),
+        team_cache=team_overviews.stats(),
+        trends=trend_detector.stats(),
+        ingest=ingest_buffer.stats() if ingest_buffer else {"write_behind": False}
+    )
+
 # ======================
 # ENTRY
 # ======================
@@ -0,0 +1,241 @@
+"""
+Database benchmarks: ingest and history queries against a table holding
+`--rows` readings for one dedicated benchmark athlete.
+
+Runs against DATABASE_URL (loaded from .env), or a throwaway PostgreSQL
+in a temp dir with --temp-db. Seeded rows are kept between runs so a
+1M-row table is only built once; --cleanup removes them afterwards.
+
+    python benchmarks/bench_db.py --temp-db --rows 1000000
+    python benchmarks/bench_db.py --rows 5000000 --output db.json --cleanup
+"""
+
+import time
+import random
+import argparse
+import contextlib
+from datetime import datetime, timedelta, timezone
+
+from common import bench, report, summarize, temp_postgres
+
+SEED_CHUNK = 250000
+SESSION_TABLES = ("health_data_1m", "health_data_1h", "training_sessions", "health_events")
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ======================
+# SEEDING
+# ======================
+def seed(athlete_id, rows, interval):
+    """
+    Fill health_data with `rows` readings for `athlete_id`, one every
+    `interval` seconds ending now, then rebuild its rollups and sessions.
+    Returns the seeding timings, or None when the rows already exist.
+    """
+    from utils.db_pool import get_connection, release_connection
+    from utils.db_utils import _is_partitioned, _ensure_partitions, rebuild_rollups, rebuild_training_sessions
+
+    end = _utc_now().replace(microsecond=0)
+    start = end - timedelta(seconds=interval * (rows - 1))
+
+    conn = get_connection()
+    if not conn:
+        raise SystemExit("❌ No database connection (set DATABASE_URL or use --temp-db)")
+
+    try:
+        existing = conn.execute(
+            "SELECT count(*) AS n FROM health_data WHERE athlete_id = %s", (athlete_id,)
+        ).fetchone()["n"]
+        conn.commit()
+        if existing >= rows:
+            print(f"✅ Reusing {existing:,} seeded rows for athlete {athlete_id}")
+            return None
+
+        _delete_athlete(conn, athlete_id)
+        with conn.cursor() as cur:
+            partitioned = _is_partitioned(cur)
+        conn.commit()
+        if partitioned:
+            _ensure_partitions(conn, since=start.date())
+
+        print(f"🌱 Seeding {rows:,} rows for athlete {athlete_id}...")
+        started = time.perf_counter()
+        for offset in range(0, rows, SEED_CHUNK):
+            # Smooth per-session curves with noise; ~1% abnormal temperatures
+            conn.execute("""
+                INSERT INTO health_data (athlete_id, heart_rate, temperature, timestamp, is_abnormal, alert_message)
+                SELECT %(athlete)s, hr, temp, ts, temp > 37.5, CASE WHEN temp > 37.5 THEN 'Fever' ELSE 'OK' END
+                FROM (
+                    SELECT
+                        %(start)s::timestamp + make_interval(secs => g * %(interval)s) AS ts,
+                        round((120 + 40 * sin(g / 600.0) + random() * 10)::numeric, 2) AS hr,
+                        round((36.6 + 0.4 * sin(g / 3000.0) + random() * 0.7)::numeric, 2) AS temp
+                    FROM generate_series(%(lower)s::int, %(upper)s::int) AS g
+                ) AS s
+            """, {
+                "athlete": athlete_id, "start": start, "interval": interval,
+                "lower": offset, "upper": min(offset + SEED_CHUNK, rows) - 1,
+            })
+            conn.commit()
+        inserted = time.perf_counter() - started
+        conn.execute("ANALYZE health_data")
+        conn.commit()
+    finally:
+        release_connection(conn)
+
+    started = time.perf_counter()
+    rebuild_rollups(start - timedelta(hours=1), end + timedelta(hours=1))
+    rollups = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rebuild_training_sessions(athlete_id)
+    sessions = time.perf_counter() - started
+
+    print(f"✅ Seeded in {inserted:.1f}s ({rows / inserted:,.0f} rows/s), "
+          f"rollups {rollups:.1f}s, sessions {sessions:.1f}s")
+    return {"rows": rows, "insert_s": round(inserted, 2), "rows_per_sec": round(rows / inserted),
+            "rollups_s": round(rollups, 2), "sessions_s": round(sessions, 2)}
+
+
+def _delete_athlete(conn, athlete_id):
+    # Rollups and sessions are derived from health_data, events hold its ids
+    for table in SESSION_TABLES + ("health_data",):
+        conn.execute(f"DELETE FROM {table} WHERE athlete_id = %s", (athlete_id,))
+    conn.commit()
+
+
+def cleanup(athlete_id):
+    from utils.db_pool import get_connection, release_connection
+    conn = get_connection()
+    try:
+        _delete_athlete(conn, athlete_id)
+        print(f"🧹 Removed benchmark rows for athlete {athlete_id}")
+    finally:
+        release_connection(conn)
+
+
+# ======================
+# BENCHMARKS
+# ======================
+def _rows(athlete_id, n, rng):
+    now = _utc_now()
+    return [
+        (athlete_id, round(rng.uniform(60, 190), 2), round(rng.uniform(36.0, 38.0), 2),
+         now - timedelta(milliseconds=n - i), False, "OK")
+        for i in range(n)
+    ]
+
+
+def run(args):
+    from utils.db_utils import (
+        init_db,
+        insert_health_data_batch,
+        get_latest_data,
+        get_history_data,
+        get_history_columns,
+        get_history_page,
+        get_history_rollup,
+        get_history_cursor,
+        get_history_since,
+    )
+
+    if not init_db():
+        raise SystemExit("❌ init_db failed")
+
+    seeded = seed(args.athlete_id, args.rows, args.interval)
+    athlete, repeat = args.athlete_id, args.repeat
+    rng = random.Random(11)
+    results = {}
+
+    # Ingest: one reading per commit vs. device-sized batches
+    results["insert.single"] = bench(
+        lambda: insert_health_data_batch(_rows(athlete, 1, rng)), repeat=repeat * 4)
+    results[f"insert.batch[{args.batch}]"] = bench(
+        lambda: insert_health_data_batch(_rows(athlete, args.batch, rng)),
+        repeat=max(5, repeat // 2), items_per_call=args.batch)
+
+    results["latest"] = bench(get_latest_data, athlete, repeat=repeat * 4)
+
+    # History: the dashboard's live window, raw and downsampled, and a
+    # historical range that only the rollups make cheap
+    for hours in args.hours:
+        results[f"history.raw[{hours}h]"] = bench(get_history_data, athlete, hours, repeat=repeat)
+        results[f"history.columns[{hours}h]"] = bench(get_history_columns, athlete, hours, repeat=repeat)
+        results[f"history.points500[{hours}h]"] = bench(get_history_data, athlete, hours, 500, repeat=repeat)
+        results[f"history.page1000[{hours}h]"] = bench(
+            get_history_page, athlete, hours, None, None, 1000, repeat=repeat)
+        results[f"history.rollup300s[{hours}h]"] = bench(
+            get_history_rollup, athlete, 300, hours, repeat=repeat)
+
+    # Polling delta: a dashboard that is one insert behind
+    since = get_history_cursor()
+    insert_health_data_batch(_rows(athlete, 1, rng))
+    results["history.since"] = bench(get_history_since, athlete, since, repeat=repeat * 4)
+
+    # Concurrent batch ingest: rows/sec with the pool under contention
+    results[f"insert.concurrent[{args.writers}x{args.batch}]"] = _concurrent_inserts(
+        insert_health_data_batch, athlete, args.writers, args.batch, max(5, repeat // 2))
+
+    params = {
+        "rows": args.rows, "interval_s": args.interval, "athlete_id": athlete,
+        "repeat": repeat, "batch": args.batch, "writers": args.writers,
+        "hours": args.hours, "temp_db": args.temp_db, "seed": seeded,
+    }
+    report("db", params, results, args.output)
+
+    if args.cleanup:
+        cleanup(athlete)
+
+
+def _concurrent_inserts(insert, athlete, writers, batch, calls):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def writer(seed):
+        rng = random.Random(seed)
+        samples = []
+        for _ in range(calls):
+            rows = _rows(athlete, batch, rng)
+            started = time.perf_counter()
+            insert(rows)
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(writers) as pool:
+        samples = [s for part in pool.map(writer, range(writers)) for s in part]
+    return summarize(samples, batch, elapsed=time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="seeded readings for the benchmark athlete")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between seeded readings")
+    parser.add_argument("--athlete-id", type=int, default=900001, help="athlete the benchmark owns")
+    parser.add_argument("--repeat", type=int, default=50, help="calls per query benchmark")
+    parser.add_argument("--batch", type=int, default=500, help="readings per batch insert")
+    parser.add_argument("--writers", type=int, default=4, help="threads for the concurrent insert benchmark")
+    parser.add_argument("--hours", type=lambda v: [int(h) for h in v.split(",")], default=[1, 24, 168],
+                        help="comma-separated history windows")
+    parser.add_argument("--temp-db", action="store_true", help="run against a throwaway PostgreSQL")
+    parser.add_argument("--cleanup", action="store_true", help="delete the benchmark athlete's rows afterwards")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    # utils.db_pool reads DATABASE_URL at import: load .env or start the
+    # temp server before importing anything from utils
+    if args.temp_db:
+        context = temp_postgres()
+    else:
+        from dotenv import load_dotenv
+        load_dotenv()
+        context = contextlib.nullcontext()
+
+    with context:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Micro-benchmarks for the health model, the alert thresholds and the
+binary reading decoder. No database needed.
+
+    python benchmarks/bench_model.py
+    python benchmarks/bench_model.py --repeat 5000 --output model.json
+"""
+
+import os
+import random
+import argparse
+from datetime import datetime, timezone
+
+from common import ROOT, bench, report
+
+
+def _readings(n, seed=7):
+    rng = random.Random(seed)
+    hr = [round(rng.uniform(45, 200), 2) for _ in range(n)]
+    temp = [round(rng.uniform(35.0, 39.5), 2) for _ in range(n)]
+    age = [rng.randint(13, 80) for _ in range(n)]
+    return hr, temp, age
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per single-reading benchmark")
+    parser.add_argument("--batch-sizes", default="100,1000,10000", help="comma-separated batch sizes")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    # health_model.npz is resolved relative to the working directory
+    os.chdir(ROOT)
+    from utils.ai_model import HealthAIModel, AlertThresholds
+    from utils.ingest import encode_readings, decode_readings, MAX_BATCH_SIZE
+
+    model = HealthAIModel()
+    thresholds = AlertThresholds()
+    sizes = [int(s) for s in args.batch_sizes.split(",") if s]
+    results = {}
+
+    results["model.predict"] = bench(model.predict, 172.0, 37.9, 30, repeat=args.repeat)
+    results["thresholds.classify_one"] = bench(thresholds.classify_one, 172.0, 37.9, 30, repeat=args.repeat * 10)
+
+    for n in sizes:
+        hr, temp, age = _readings(n)
+        repeat = max(10, args.repeat * 10 // n)
+        results[f"model.predict_batch[{n}]"] = bench(model.predict_batch, hr, temp, age, repeat=repeat, items_per_call=n)
+        results[f"thresholds.classify[{n}]"] = bench(thresholds.classify, hr, temp, age, repeat=repeat, items_per_call=n)
+
+    # Devices send at most MAX_BATCH_SIZE readings per binary request
+    n = min(max(sizes), MAX_BATCH_SIZE)
+    hr, temp, _ = _readings(n)
+    now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    payload = encode_readings([(1, now_ms - i * 1000, hr[i], temp[i], 0) for i in range(n)])
+    results[f"ingest.decode_readings[{n}]"] = bench(decode_readings, payload, repeat=max(10, args.repeat // 10), items_per_call=n)
+
+    params = {"repeat": args.repeat, "batch_sizes": sizes, "model_path": model.model_path}
+    report("model", params, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
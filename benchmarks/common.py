@@ -0,0 +1,167 @@
+"""
+Shared helpers for the benchmark scripts: timing, percentile summaries,
+machine-readable result files and a throwaway PostgreSQL instance.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime, timezone
+
+# Make `utils` importable when a script is run as `python benchmarks/x.py`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+# ======================
+# TIMING / SUMMARIES
+# ======================
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def summarize(samples, items_per_call=1, elapsed=None, errors=0):
+    """
+    Latency summary of per-call durations (seconds). Throughput uses the
+    wall time `elapsed` when given (concurrent runs), else the sum.
+    """
+    samples = sorted(samples)
+    total = elapsed if elapsed is not None else sum(samples)
+    calls = len(samples)
+    ms = [s * 1000 for s in samples]
+    return {
+        "calls": calls,
+        "errors": errors,
+        "mean_ms": round(sum(ms) / calls, 6) if calls else 0.0,
+        "p50_ms": round(percentile(ms, 0.50), 6),
+        "p95_ms": round(percentile(ms, 0.95), 6),
+        "p99_ms": round(percentile(ms, 0.99), 6),
+        "max_ms": round(ms[-1], 6) if ms else 0.0,
+        "calls_per_sec": round(calls / total, 2) if total else 0.0,
+        "items_per_sec": round(calls * items_per_call / total, 2) if total else 0.0,
+    }
+
+
+def bench(fn, *args, repeat=1000, warmup=10, items_per_call=1):
+    """Call fn(*args) `repeat` times and summarize the per-call latency."""
+    for _ in range(warmup):
+        fn(*args)
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples, items_per_call)
+
+
+# ======================
+# RESULT FILES
+# ======================
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(suite, params, results, output=None):
+    """Print a table and optionally write the JSON document compare.py reads."""
+    document = {
+        "suite": suite,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+
+    width = max((len(name) for name in results), default=10)
+    print(f"\n{'benchmark':<{width}}  {'calls':>8}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}  {'items/s':>12}")
+    for name, r in results.items():
+        print(f"{name:<{width}}  {r['calls']:>8}  {r['p50_ms']:>9.3f}  {r['p95_ms']:>9.3f}  "
+              f"{r['p99_ms']:>9.3f}  {r['items_per_sec']:>12,.0f}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"\n💾 Results written to {output}")
+    return document
+
+
+# ======================
+# THROWAWAY POSTGRES
+# ======================
+def _run(*command):
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{os.path.basename(command[0])} failed: {result.stderr.strip()}")
+
+
+@contextlib.contextmanager
+def _initdb_server(workdir):
+    bindir = os.path.dirname(shutil.which("initdb"))
+    data = os.path.join(workdir, "data")
+    _run(os.path.join(bindir, "initdb"), "-D", data, "-U", "postgres", "--auth=trust")
+    _run(os.path.join(bindir, "pg_ctl"), "-D", data, "-l", os.path.join(workdir, "postgres.log"),
+         "-w", "start", "-o", f"-c listen_addresses='' -k {workdir}")
+    try:
+        yield f"postgresql://postgres@/postgres?host={workdir}"
+    finally:
+        subprocess.run([os.path.join(bindir, "pg_ctl"), "-D", data, "-m", "fast", "stop"], capture_output=True)
+
+
+@contextlib.contextmanager
+def _pgserver_server(workdir):
+    # pip install pgserver: bundled binaries, also works when run as root
+    import pgserver
+    server = pgserver.get_server(workdir, cleanup_mode="stop")
+    try:
+        yield server.get_uri()
+    finally:
+        server.cleanup()
+
+
+@contextlib.contextmanager
+def temp_postgres():
+    """
+    Run a private PostgreSQL in a temp directory (unix socket only) and
+    point DATABASE_URL at it. Uses `initdb` from PATH, else the pgserver
+    package. Import utils.* only inside the block: the pool reads
+    DATABASE_URL at import time.
+    """
+    try:
+        import pgserver  # noqa: F401
+        server = _pgserver_server
+    except ImportError:
+        if not shutil.which("initdb"):
+            raise RuntimeError("no PostgreSQL binaries: install PostgreSQL or `pip install pgserver`")
+        server = _initdb_server
+
+    workdir = tempfile.mkdtemp(prefix="athlete-bench-")
+    try:
+        with server(workdir) as url:
+            os.environ["DATABASE_URL"] = url
+            os.environ["DB_SSLMODE"] = "disable"
+            print(f"🐘 Temporary PostgreSQL running in {workdir}")
+            yield url
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
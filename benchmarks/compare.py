@@ -0,0 +1,74 @@
+"""
+Compare two benchmark result files (from any --output) benchmark by
+benchmark. Exits non-zero when a p50/p95 latency regressed by more than
+--threshold percent, so it can gate CI.
+
+    python benchmarks/compare.py baseline.json candidate.json
+    python benchmarks/compare.py base.json new.json --metric p99_ms --threshold 10
+"""
+
+import sys
+import json
+import argparse
+
+
+def _change(before, after):
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", action="append", help="latency metric(s) to gate on (default p50_ms, p95_ms)")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+    metrics = args.metric or ["p50_ms", "p95_ms"]
+
+    with open(args.baseline) as f:
+        base = json.load(f)
+    with open(args.candidate) as f:
+        new = json.load(f)
+
+    if base["suite"] != new["suite"]:
+        print(f"⚠️ Comparing different suites: {base['suite']} vs {new['suite']}")
+    if base["params"] != new["params"]:
+        changed = sorted(k for k in set(base["params"]) | set(new["params"])
+                         if base["params"].get(k) != new["params"].get(k))
+        print(f"⚠️ Parameters differ: {', '.join(changed)}")
+    print(f"{base.get('commit')} -> {new.get('commit')}\n")
+
+    names = [n for n in base["results"] if n in new["results"]]
+    width = max((len(n) for n in names), default=10)
+    header = "".join(f"  {m:>22}" for m in metrics + ["items_per_sec"])
+    print(f"{'benchmark':<{width}}{header}")
+
+    regressions = []
+    for name in names:
+        before, after = base["results"][name], new["results"][name]
+        cells = []
+        for metric in metrics + ["items_per_sec"]:
+            change = _change(before.get(metric, 0), after.get(metric, 0))
+            text = f"{before.get(metric, 0):.3f}→{after.get(metric, 0):.3f}"
+            if change is not None:
+                text += f" {change:+.0f}%"
+            cells.append(f"  {text:>22}")
+            if metric in metrics and change is not None and change > args.threshold:
+                regressions.append(f"{name} {metric} {change:+.0f}%")
+        print(f"{name:<{width}}{''.join(cells)}")
+
+    for name in sorted(set(base["results"]) ^ set(new["results"])):
+        print(f"{name:<{width}}  (only in {'baseline' if name in base['results'] else 'candidate'})")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0f}%:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    print(f"\n✅ No regression over {args.threshold:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Synthetic load against a running server: N devices posting readings to
+/api/sensor-data-raw and M dashboards polling the way static/js/2ndpage.js
+does (latest reading with If-None-Match, then ?since= history deltas).
+
+    python benchmarks/loadgen.py --devices 50 --dashboards 20 --duration 60 \\
+        --email bench@example.com --password secret --output load.json
+    python benchmarks/loadgen.py --devices 10 --binary --batch 100 --rate 50
+
+Dashboards need a session: pass --token, or --email/--password to log in
+(the account is registered first if it does not exist). Devices post as
+athletes --first-athlete.. onwards; device 0 posts as the dashboard user so
+the polled deltas carry rows.
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit, urlencode
+
+from common import report, summarize
+
+BINARY_CONTENT_TYPE = "application/x-athlete-readings"
+
+
+class Client:
+    """One keep-alive HTTP connection, reopened after errors."""
+
+    def __init__(self, url, token=None):
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.token = token
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if self.conn is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = factory(self.host, timeout=30)
+        try:
+            self.conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            return response.status, response.headers, response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+
+    def post_json(self, path, payload):
+        return self.request("POST", path, json.dumps(payload), {"Content-Type": "application/json"})
+
+
+class Recorder:
+    """Thread-safe latency samples and error counts per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.items = {}
+        self.statuses = {}
+
+    def record(self, name, seconds, status, items=0):
+        ok = status is not None and (200 <= status < 300 or status == 304)
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+            self.statuses.setdefault(name, {})
+            key = str(status) if status is not None else "connection_error"
+            self.statuses[name][key] = self.statuses[name].get(key, 0) + 1
+            if ok:
+                self.items[name] = self.items.get(name, 0) + items
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def add(self, name, items):
+        with self._lock:
+            self.items[name] = self.items.get(name, 0) + items
+
+    def results(self, elapsed):
+        results = {}
+        for name, samples in sorted(self.samples.items()):
+            summary = summarize(samples, elapsed=elapsed, errors=self.errors.get(name, 0))
+            # items/sec counts delivered rows only (e.g. stored readings)
+            summary["items_per_sec"] = round(self.items.get(name, 0) / elapsed, 2)
+            summary["statuses"] = self.statuses[name]
+            results[name] = summary
+        return results
+
+
+def timed(recorder, name, call, items=0):
+    started = time.perf_counter()
+    try:
+        status, headers, body = call()
+    except (OSError, http.client.HTTPException):
+        recorder.record(name, time.perf_counter() - started, None)
+        return None, None, None
+    recorder.record(name, time.perf_counter() - started, status, items)
+    return status, headers, body
+
+
+# ======================
+# SESSION
+# ======================
+def login(url, email, password):
+    client = Client(url)
+    status, _, body = client.post_json("/api/login", {"email": email, "password": password})
+    if status == 401:
+        client.post_json("/api/register", {"username": email.split("@")[0], "email": email, "password": password})
+        status, _, body = client.post_json("/api/login", {"email": email, "password": password})
+    if status != 200:
+        raise SystemExit(f"❌ Login failed ({status}): {body[:200]!r}")
+    data = json.loads(body)
+    return data["token"], data["user"]["id"]
+
+
+def whoami(url, token):
+    status, _, body = Client(url, token).request("GET", "/api/verify-session")
+    if status != 200:
+        raise SystemExit(f"❌ Token rejected ({status})")
+    data = json.loads(body)
+    return (data.get("user") or {}).get("id")
+
+
+# ======================
+# DEVICES / DASHBOARDS
+# ======================
+def device(args, recorder, stop, athlete_id, seed):
+    """Post `batch` readings every batch/rate seconds, on a fixed schedule."""
+    from utils.ingest import encode_readings
+
+    rng = random.Random(seed)
+    client = Client(args.url)
+    interval = args.batch / args.rate
+    hr, temp = rng.uniform(70, 120), rng.uniform(36.3, 36.9)
+    next_send = time.perf_counter() + rng.uniform(0, interval)
+
+    while not stop.is_set():
+        delay = next_send - time.perf_counter()
+        if delay > 0 and stop.wait(delay):
+            break
+        # Behind schedule (server slower than the offered load): skip ahead
+        # rather than burst, and let the latencies show it
+        next_send = max(next_send + interval, time.perf_counter())
+
+        readings = []
+        for _ in range(args.batch):
+            hr = min(200.0, max(45.0, hr + rng.gauss(0, 1.5)))
+            temp = min(40.0, max(35.0, temp + rng.gauss(0, 0.02)))
+            readings.append((round(hr, 2), round(temp, 2)))
+
+        if args.binary:
+            now_ms = int(time.time() * 1000)
+            body = encode_readings([
+                (athlete_id, now_ms - (len(readings) - i) * 10, h, t, 0) for i, (h, t) in enumerate(readings)
+            ])
+            call = lambda: client.request("POST", "/api/sensor-data-raw", body, {"Content-Type": BINARY_CONTENT_TYPE})
+        else:
+            h, t = readings[-1]
+            payload = {"athlete_id": athlete_id, "heart_rate": h, "temperature": t}
+            call = lambda: client.post_json("/api/sensor-data-raw", payload)
+
+        timed(recorder, "device.post", call, items=len(readings))
+
+
+def dashboard(args, recorder, stop, token, seed):
+    rng = random.Random(seed)
+    client = Client(args.url, token)
+
+    status, headers, _ = timed(
+        recorder, "dashboard.history_initial",
+        lambda: client.request("GET", f"/api/history?{urlencode({'hours': args.hours, 'points': 500})}"))
+    cursor = headers.get("X-Cursor") if headers else None
+    etag = None
+
+    # Dashboards open at random moments within one poll interval
+    if stop.wait(rng.uniform(0, args.poll)):
+        return
+
+    while not stop.is_set():
+        conditional = {"If-None-Match": etag} if etag else {}
+        status, headers, _ = timed(
+            recorder, "dashboard.latest", lambda: client.request("GET", "/api/latest-data", headers=conditional))
+        if status == 200:
+            etag = headers.get("ETag")
+
+        if cursor:
+            query = urlencode({"since": cursor, "hours": args.hours})
+            status, headers, body = timed(
+                recorder, "dashboard.history_since", lambda: client.request("GET", f"/api/history?{query}"))
+            if status == 200:
+                cursor = headers.get("X-Cursor") or cursor
+                recorder.add("dashboard.rows_received", len(json.loads(body)))
+
+        stop.wait(args.poll)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="server base URL")
+    parser.add_argument("--devices", type=int, default=10, help="simulated sensor devices")
+    parser.add_argument("--dashboards", type=int, default=5, help="simulated open dashboards")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--rate", type=float, default=1.0, help="readings per second per device")
+    parser.add_argument("--batch", type=int, default=1, help="readings per request (binary format only)")
+    parser.add_argument("--binary", action="store_true", help="post the compact binary format")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds between dashboard polls")
+    parser.add_argument("--hours", type=int, default=1, help="history window the dashboards request")
+    parser.add_argument("--first-athlete", type=int, default=900101, help="athlete id of device 1")
+    parser.add_argument("--token", help="session token for the dashboards")
+    parser.add_argument("--email", help="log in (registering if needed) with this account")
+    parser.add_argument("--password", help="password for --email")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if args.batch > 1 and not args.binary:
+        parser.error("--batch needs --binary (JSON posts carry one reading)")
+
+    token, user_id = args.token, None
+    if not token and args.email:
+        token, user_id = login(args.url, args.email, args.password or "")
+    elif token:
+        user_id = whoami(args.url, token)
+    if args.dashboards and not token:
+        parser.error("dashboards need --token or --email/--password")
+
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = []
+    for i in range(args.devices):
+        athlete_id = user_id if i == 0 and user_id else args.first_athlete + i
+        threads.append(threading.Thread(target=device, args=(args, recorder, stop, athlete_id, i), daemon=True))
+    for i in range(args.dashboards):
+        threads.append(threading.Thread(target=dashboard, args=(args, recorder, stop, token, 1000 + i), daemon=True))
+
+    print(f"🚀 {args.devices} device(s) at {args.rate}/s, {args.dashboards} dashboard(s) "
+          f"every {args.poll}s against {args.url} for {args.duration:.0f}s")
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    elapsed = time.perf_counter() - started
+
+    results = recorder.results(elapsed)
+    rows = recorder.items.get("device.post", 0)
+    params = {
+        "url": args.url, "devices": args.devices, "dashboards": args.dashboards,
+        "duration_s": round(elapsed, 2), "rate_per_device": args.rate, "batch": args.batch,
+        "binary": args.binary, "poll_s": args.poll, "hours": args.hours,
+        "offered_rows_per_sec": args.devices * args.rate,
+        "stored_rows_per_sec": round(rows / elapsed, 2),
+        "dashboard_rows_per_sec": round(recorder.items.get("dashboard.rows_received", 0) / elapsed, 2),
+    }
+    report("load", params, results, args.output)
+    print(f"📈 {params['stored_rows_per_sec']:,.0f} rows/s stored "
+          f"(offered {params['offered_rows_per_sec']:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
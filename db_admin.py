@@ -0,0 +1,117 @@
+"""
+Database maintenance tasks for the health dashboard.
+
+    python db_admin.py init                 # create tables and indexes
+    python db_admin.py indexes              # build missing or invalid health_data indexes
+    python db_admin.py partitions           # create upcoming monthly partitions
+    python db_admin.py migrate-partitions   # move a plain health_data into partitions
+    python db_admin.py rollups --days 30    # rebuild minute/hour rollups from raw rows
+    python db_admin.py sessions             # rebuild training sessions from raw rows
+    python db_admin.py events               # log abnormal readings missing from health_events
+    python db_admin.py retention            # compact and delete data past its retention
+"""
+
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from utils.db_utils import (
+    init_db,
+    create_health_data_indexes,
+    ensure_health_data_partitions,
+    migrate_health_data_to_partitioned,
+    rebuild_rollups,
+    rebuild_training_sessions,
+    rebuild_health_events,
+    apply_retention,
+    RETENTION_DAYS,
+    RETENTION_CHUNK_HOURS,
+)
+from utils.auth_utils import init_auth_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("init", help="create tables and indexes")
+    commands.add_parser("indexes", help="build missing or invalid health_data indexes (CONCURRENTLY)")
+
+    partitions = commands.add_parser("partitions", help="create upcoming monthly partitions")
+    partitions.add_argument("--months-ahead", type=int, default=None)
+
+    migrate = commands.add_parser("migrate-partitions", help="convert health_data to monthly partitions")
+    migrate.add_argument("--batch-size", type=int, default=50000)
+
+    rollups = commands.add_parser("rollups", help="rebuild minute/hour rollups from raw rows")
+    rollups.add_argument("--days", type=int, default=30, help="how far back to rebuild")
+
+    sessions = commands.add_parser("sessions", help="rebuild training sessions from raw rows")
+    sessions.add_argument("--athlete-id", type=int, default=None, help="only this athlete")
+
+    events = commands.add_parser("events", help="backfill the abnormal event log from raw rows")
+    events.add_argument("--days", type=int, default=None, help="how far back to look (default: all)")
+
+    retention = commands.add_parser("retention", help="compact and delete data older than its retention")
+    retention.add_argument("--raw-days", type=int, default=RETENTION_DAYS["health_data"])
+    retention.add_argument("--minute-days", type=int, default=RETENTION_DAYS["health_data_1m"])
+    retention.add_argument("--hour-days", type=int, default=RETENTION_DAYS["health_data_1h"], help="0 keeps forever")
+    retention.add_argument("--chunk-hours", type=int, default=RETENTION_CHUNK_HOURS)
+    retention.add_argument("--max-chunks", type=int, default=None, help="stop after this many chunks")
+
+    args = parser.parse_args()
+
+    if args.command == "init":
+        ok = init_db() and init_auth_db() and create_health_data_indexes() is not None
+        print("✅ Databases initialized" if ok else "❌ Initialization failed")
+    elif args.command == "indexes":
+        started = time.perf_counter()
+        built = create_health_data_indexes()
+        if built is None:
+            print("❌ No database connection")
+        else:
+            print(f"✅ {built} index(es) built in {time.perf_counter() - started:.1f}s")
+    elif args.command == "partitions":
+        created = ensure_health_data_partitions(args.months_ahead)
+        print(f"✅ {created} partition(s) created")
+    elif args.command == "migrate-partitions":
+        migrate_health_data_to_partitioned(args.batch_size)
+    elif args.command == "rollups":
+        started = time.perf_counter()
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=args.days)
+        buckets = rebuild_rollups(since)
+        print(f"✅ {buckets} rollup bucket(s) rebuilt in {time.perf_counter() - started:.1f}s")
+    elif args.command == "sessions":
+        started = time.perf_counter()
+        sessions = rebuild_training_sessions(args.athlete_id)
+        print(f"✅ {sessions} training session(s) rebuilt in {time.perf_counter() - started:.1f}s")
+    elif args.command == "events":
+        started = time.perf_counter()
+        since = None
+        if args.days:
+            since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=args.days)
+        events = rebuild_health_events(since)
+        print(f"✅ {events} event(s) logged in {time.perf_counter() - started:.1f}s")
+    elif args.command == "retention":
+        report = apply_retention(
+            {"health_data": args.raw_days, "health_data_1m": args.minute_days, "health_data_1h": args.hour_days},
+            args.chunk_hours, args.max_chunks
+        )
+        if report is None:
+            print("❌ No database connection")
+        elif report["skipped"]:
+            print("⚠️ Another retention run is in progress")
+        else:
+            rollups = sum(report["rollups_deleted"].values())
+            print(f"✅ {report['raw_deleted']} raw row(s) deleted, {report['partitions_dropped']} partition(s) dropped, "
+                  f"{report['buckets_compacted']} bucket(s) compacted, {rollups} rollup bucket(s) expired "
+                  f"in {report['seconds']:.1f}s")
+            if not report["complete"]:
+                print(f"⚠️ Stopped after {report['chunks']} chunk(s); run again to continue")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@
 
 const API_URL = window.location.origin + '/api';
 const UPDATE_INTERVAL = 5000;
-const ABNORMAL_TEMP_THRESHOLD = 36.5;
+const CHART_POINTS = 500;
 
 const getAuthToken = () => localStorage.getItem('auth_token');
 
@@ -90,19 +90,111 @@ async function updateDashboard() {
     const data = await response.json();
     if (!data || !data.heart_rate) throw new Error('Invalid data');
     
-    const hrEl = document.getElementById('heartRateValue');
-    const tempEl = document.getElementById('tempValue');
-    if (hrEl) hrEl.textContent = `${parseFloat(data.heart_rate).toFixed(2)} BPM`;
-    if (tempEl) tempEl.textContent = `${parseFloat(data.temperature).toFixed(1)} °C`;
-
-    checkAlert(data);
+    renderLatest(data);
     await updateCharts();
-    await loadLoginSessions();
   } catch (error) {
     console.error("Error updating dashboard:", error);
   }
 }
 
+function renderLatest(data) {
+  const hrEl = document.getElementById('heartRateValue');
+  const tempEl = document.getElementById('tempValue');
+  if (hrEl) hrEl.textContent = `${parseFloat(data.heart_rate).toFixed(2)} BPM`;
+  if (tempEl) tempEl.textContent = `${parseFloat(data.temperature).toFixed(1)} °C`;
+
+  checkAlert(data);
+}
+
+// ============================================================================
+// LIVE UPDATES (Server-Sent Events, polling fallback)
+// ============================================================================
+
+let eventSource = null;
+let pollTimer = null;
+let historyCursor = null;
+
+function appendToChart(chart, label, value) {
+  if (!chart || !chart.data) return;
+  chart.data.labels.push(label);
+  chart.data.datasets[0].data.push(value);
+  if (chart.data.labels.length > CHART_POINTS) {
+    chart.data.labels.shift();
+    chart.data.datasets[0].data.shift();
+  }
+  chart.update('none');
+}
+
+function appendReading(reading) {
+  const label = new Date(reading.timestamp).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+  appendToChart(heartRateChart, label, parseFloat(reading.heart_rate));
+  appendToChart(tempChart, label, parseFloat(reading.temperature));
+}
+
+function applyReading(reading) {
+  renderLatest(reading);
+  appendReading(reading);
+}
+
+// Fetch only readings stored after historyCursor and append them
+async function pollHistory() {
+  if (!historyCursor) return updateDashboard();
+
+  try {
+    const response = await apiCall(`/history?hours=24&since=${encodeURIComponent(historyCursor)}&limit=${CHART_POINTS}`);
+    if (!response || !response.ok) return;
+
+    const records = await response.json();
+    historyCursor = response.headers.get('X-Cursor') || historyCursor;
+
+    // Too far behind to patch: reload the whole window instead
+    if (records.length >= CHART_POINTS) return updateDashboard();
+    if (records.length === 0) return;
+
+    records.forEach(appendReading);
+    renderLatest(records[records.length - 1]);
+  } catch (error) {
+    console.error("Error polling history:", error);
+  }
+}
+
+function startPolling() {
+  if (!pollTimer) pollTimer = setInterval(pollHistory, UPDATE_INTERVAL);
+}
+
+function stopPolling() {
+  if (pollTimer) {
+    clearInterval(pollTimer);
+    pollTimer = null;
+  }
+}
+
+function connectStream() {
+  if (!window.EventSource) {
+    startPolling();
+    return;
+  }
+
+  let opened = false;
+  eventSource = new EventSource(`${API_URL}/stream`, { withCredentials: true });
+
+  eventSource.addEventListener('reading', (event) => applyReading(JSON.parse(event.data)));
+
+  eventSource.onopen = () => {
+    stopPolling();
+    // Resync anything missed while reconnecting
+    if (opened) updateCharts();
+    opened = true;
+  };
+
+  eventSource.onerror = () => {
+    if (eventSource.readyState === EventSource.CLOSED) {
+      eventSource = null;
+      startPolling();
+    }
+  };
+}
+
 function checkAlert(data) {
   const alertBox = document.getElementById('alertBox');
   const alertMessage = document.getElementById('alertMessage');
@@ -117,26 +209,27 @@ function checkAlert(data) {
 
 async function updateCharts() {
   try {
-    const response = await apiCall('/history?hours=24');
+    // Columnar: parallel arrays, epoch-ms timestamps
+    const response = await apiCall(`/history?hours=24&points=${CHART_POINTS}&format=columns`);
     if (!response || !response.ok) return;
     
-    const records = await response.json();
-    if (!records || records.length === 0) return;
+    historyCursor = response.headers.get('X-Cursor');
+    const columns = await response.json();
+    if (!columns || !columns.t || columns.t.length === 0) return;
 
-    const labels = records.map(d => {
-      const date = new Date(d.timestamp);
-      return date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
-    });
+    const labels = columns.t.map(ms =>
+      new Date(ms).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit', timeZone: 'Asia/Manila' })
+    );
     
     if (heartRateChart && heartRateChart.data) {
       heartRateChart.data.labels = labels;
-      heartRateChart.data.datasets[0].data = records.map(d => parseFloat(d.heart_rate));
+      heartRateChart.data.datasets[0].data = columns.hr;
       heartRateChart.update();
     }
 
     if (tempChart && tempChart.data) {
       tempChart.data.labels = labels;
-      tempChart.data.datasets[0].data = records.map(d => parseFloat(d.temperature));
+      tempChart.data.datasets[0].data = columns.temp;
       tempChart.update();
     }
   } catch (error) {
@@ -146,32 +239,37 @@ async function updateCharts() {
 
 async function loadLoginSessions() {
   try {
-    const response = await apiCall('/history?hours=168');
+    const response = await apiCall('/sessions?days=7&limit=20');
     if (!response || !response.ok) return;
     
-    const allData = await response.json();
-    if (!allData || allData.length === 0) {
+    loginSessions = await response.json();
+    if (!loginSessions || loginSessions.length === 0) {
       const list = document.getElementById('loginHistoryList');
       if (list) list.innerHTML = '<p class="loading-message">No data available</p>';
       return;
     }
 
-    loginSessions = [{
-      id: 1,
-      startTime: new Date(allData[0].timestamp),
-      data: allData
-    }];
-
-    renderLoginHistory();
-    if (loginSessions.length > 0) {
+    if (!loginSessions.some(session => session.id === selectedLoginId)) {
       selectedLoginId = loginSessions[0].id;
-      updateWaveformCharts(loginSessions[0]);
     }
+    renderLoginHistory();
+    await selectLoginSession(selectedLoginId);
   } catch (error) {
     console.error('Error loading login sessions:', error);
   }
 }
 
+async function selectLoginSession(sessionId) {
+  try {
+    const response = await apiCall(`/sessions/${sessionId}?points=${CHART_POINTS}`);
+    if (!response || !response.ok) return;
+
+    updateWaveformCharts(await response.json());
+  } catch (error) {
+    console.error('Error loading session:', error);
+  }
+}
+
 function renderLoginHistory() {
   const list = document.getElementById('loginHistoryList');
   if (!list) return;
@@ -181,9 +279,8 @@ function renderLoginHistory() {
     const btn = document.createElement('button');
     btn.className = `login-item ${selectedLoginId === session.id ? 'active' : ''}`;
     
-    const startTime = new Date(session.startTime);
-    const endTime = new Date(session.data[session.data.length - 1].timestamp);
-    const duration = Math.round((endTime - startTime) / (1000 * 60));
+    const startTime = new Date(session.start_time);
+    const duration = Math.round(session.duration_min);
     
     btn.innerHTML = `
       <p class="login-time">${startTime.toLocaleDateString()}</p>
@@ -194,7 +291,7 @@ function renderLoginHistory() {
     btn.addEventListener('click', () => {
       selectedLoginId = session.id;
       renderLoginHistory();
-      updateWaveformCharts(session);
+      selectLoginSession(session.id);
     });
     
     list.appendChild(btn);
@@ -202,15 +299,15 @@ function renderLoginHistory() {
 }
 
 function updateWaveformCharts(session) {
-  if (!session || !session.data || session.data.length === 0) return;
+  if (!session || !session.readings || session.readings.length === 0) return;
 
-  const labels = session.data.map(d => {
+  const labels = session.readings.map(d => {
     const date = new Date(d.timestamp);
     return date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
   });
   
-  const hrData = session.data.map(d => parseFloat(d.heart_rate));
-  const tempData = session.data.map(d => parseFloat(d.temperature));
+  const hrData = session.readings.map(d => parseFloat(d.heart_rate));
+  const tempData = session.readings.map(d => parseFloat(d.temperature));
 
   if (loginHeartRateChart && loginHeartRateChart.data) {
     loginHeartRateChart.data.labels = labels;
@@ -224,11 +321,7 @@ function updateWaveformCharts(session) {
     loginTempChart.update('none');
   }
 
-  const avgHR = Math.round(hrData.reduce((a, b) => a + b, 0) / hrData.length);
-  const maxHR = Math.max(...hrData);
-  const avgTemp = (tempData.reduce((a, b) => a + b, 0) / tempData.length).toFixed(1);
-  const duration = Math.round((new Date(session.data[session.data.length - 1].timestamp) - new Date(session.startTime)) / (1000 * 60));
-
+  // Summary stats come from the whole session, not the downsampled points
   const els = {
     avgHR: document.getElementById('avgHR'),
     maxHR: document.getElementById('maxHR'),
@@ -236,10 +329,10 @@ function updateWaveformCharts(session) {
     duration: document.getElementById('duration')
   };
 
-  if (els.avgHR) els.avgHR.textContent = `${avgHR} BPM`;
-  if (els.maxHR) els.maxHR.textContent = `${maxHR} BPM`;
-  if (els.avgTemp) els.avgTemp.textContent = `${avgTemp}°C`;
-  if (els.duration) els.duration.textContent = `${duration} min`;
+  if (els.avgHR) els.avgHR.textContent = `${Math.round(parseFloat(session.avg_hr))} BPM`;
+  if (els.maxHR) els.maxHR.textContent = `${parseFloat(session.hr_max)} BPM`;
+  if (els.avgTemp) els.avgTemp.textContent = `${parseFloat(session.avg_temp).toFixed(1)}°C`;
+  if (els.duration) els.duration.textContent = `${Math.round(session.duration_min)} min`;
 }
 
 async function loadSessionAbnormalHistory() {
@@ -254,15 +347,10 @@ async function loadSessionAbnormalHistory() {
       btn.textContent = 'Loading...';
     }
 
-    const response = await apiCall('/history?hours=168');
+    const response = await apiCall('/abnormal-events?hours=168&limit=50');
     if (!response || !response.ok) throw new Error('Failed');
     
-    const allRecords = await response.json();
-    const abnormalRecords = allRecords.filter(record => {
-      const temp = parseFloat(record.temperature);
-      const hr = parseFloat(record.heart_rate);
-      return temp > ABNORMAL_TEMP_THRESHOLD || hr > 120;
-    });
+    const abnormalRecords = await response.json();
 
     if (abnormalRecords.length === 0) {
       if (body) body.innerHTML = '';
@@ -273,15 +361,16 @@ async function loadSessionAbnormalHistory() {
       if (container) container.classList.remove('hidden');
       if (body) body.innerHTML = '';
       
-      abnormalRecords.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+      // Events arrive newest first
       abnormalRecords.forEach(record => {
         const row = document.createElement('tr');
         const temp = parseFloat(record.temperature);
         const hr = parseFloat(record.heart_rate);
         const date = new Date(record.timestamp);
+        const critical = record.severity === 'critical';
         
-        const tempClass = temp > 38.5 ? 'text-red-600 font-bold' : 'text-orange-600 font-semibold';
-        const badge = temp > 38.5 
+        const tempClass = critical ? 'text-red-600 font-bold' : 'text-orange-600 font-semibold';
+        const badge = critical 
           ? '<span class="px-2 py-1 bg-red-100 text-red-800 rounded-full text-xs font-bold">🔴 CRITICAL</span>'
           : '<span class="px-2 py-1 bg-orange-100 text-orange-800 rounded-full text-xs font-bold">🟠 WARNING</span>';
         
@@ -474,6 +563,6 @@ document.addEventListener('DOMContentLoaded', async () => {
   await loadLoginSessions();
   await loadSessionAbnormalHistory();
   
-  // Auto-refresh
-  setInterval(updateDashboard, UPDATE_INTERVAL);
+  // Live updates: pushed readings, polling only if streaming is unavailable
+  connectStream();
 });
\ No newline at end of file
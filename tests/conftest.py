@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# Make `app` and `utils` importable when pytest runs from the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Tests marked `db` need a scratch PostgreSQL: set DATABASE_URL (and
+# DB_SSLMODE=disable for a local server). They create and remove their
+# own rows for athletes >= TEST_ATHLETE.
+TEST_ATHLETE = 910000
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "db: needs DATABASE_URL")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("DATABASE_URL"):
+        return
+    skip = pytest.mark.skip(reason="DATABASE_URL not set")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def database():
+    from utils.db_utils import init_db
+    assert init_db()
+    return True
+
+
+@pytest.fixture
+def athlete(database):
+    """A throwaway athlete id whose readings (and the next id's) are removed afterwards."""
+    from utils.db_pool import get_connection, release_connection
+
+    def purge():
+        conn = get_connection()
+        try:
+            for table in ("health_events", "training_sessions", "health_data_1m", "health_data_1h", "health_data"):
+                conn.execute(f"DELETE FROM {table} WHERE athlete_id IN (%s, %s)", (TEST_ATHLETE, TEST_ATHLETE + 1))
+            conn.commit()
+        finally:
+            release_connection(conn)
+
+    purge()
+    yield TEST_ATHLETE
+    purge()
+
+
+@pytest.fixture
+def client(database):
+    from app import app
+    return app.test_client()
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.db_utils import parse_local_time
+
+
+# ======================
+# TIME PARSING
+# ======================
+@pytest.mark.parametrize("value", ["99999999999999999999", "-99999999999999999999", "inf", "nan", "0001-01-01T00:00:00"])
+def test_parse_local_time_out_of_range(value):
+    with pytest.raises(ValueError):
+        parse_local_time(value)
+
+
+@pytest.mark.db
+def test_history_rejects_huge_epoch(client, athlete):
+    from utils.auth_utils import generate_session_token
+    token = generate_session_token(2)
+    response = client.get("/api/history?from=99999999999999999999", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+
+
+# ======================
+# DOWNSAMPLING
+# ======================
+@pytest.mark.db
+def test_downsample_peaks_skip_null_heart_rates(athlete):
+    from utils.db_utils import insert_health_data_batch, get_history_downsampled
+
+    end = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=1)
+    rows = [(athlete, 100.0 + i % 7, 36.5, end - timedelta(seconds=i), False, "OK") for i in range(200)]
+    rows[50] = (athlete, None, None, rows[50][3], False, "OK")
+    rows[51] = (athlete, 150.0, 36.5, rows[51][3], False, "OK")
+    assert insert_health_data_batch(rows) == 200
+
+    # One bucket: its peak must be the 150 bpm reading, not the NULL one
+    start = end - timedelta(seconds=199)
+    picked = get_history_downsampled(athlete, points=1, start=start, end=end + timedelta(seconds=1))
+    heart_rates = [row["heart_rate"] for row in picked]
+    assert 150 in heart_rates
+
+
+# ======================
+# SINCE CURSOR
+# ======================
+def test_parse_since_cursor():
+    from utils.db_utils import parse_since_cursor
+    assert parse_since_cursor("10.2147483647.12.300.290") == (10, 2147483647, 12, 300, 290)
+    # Bare ids from earlier releases act as an id floor
+    assert parse_since_cursor("24")[4] == 24
+    for value in ("", "abc", "1.2", "-1.2.3.4.5"):
+        with pytest.raises(ValueError):
+            parse_since_cursor(value)
+
+
+@pytest.mark.db
+def test_since_delivers_rows_committed_out_of_id_order(athlete):
+    import psycopg
+    from psycopg.rows import dict_row
+    from utils.db_pool import DATABASE_URL, DB_SSLMODE
+    from utils.db_utils import _insert_columns, insert_health_data_batch, get_history_cursor, get_history_since
+    from utils.ingest import utc_now
+
+    def reading(athlete_id, hr):
+        return (athlete_id, hr, 36.6, utc_now(), False, "OK")
+
+    insert_health_data_batch([reading(athlete, 70.0)])
+    cursor = get_history_cursor()
+
+    # Tx A draws the lower id and stays open while Tx B (another athlete,
+    # so it does not wait on A's rollup rows) commits a later id
+    with psycopg.connect(DATABASE_URL, sslmode=DB_SSLMODE, row_factory=dict_row) as tx_a:
+        with tx_a.cursor() as cur:
+            (stored_a,) = _insert_columns(cur, *[[v] for v in reading(athlete, 71.0)])
+        insert_health_data_batch([reading(athlete + 1, 72.0)])
+        insert_health_data_batch([reading(athlete, 73.0)])
+
+        rows, cursor = get_history_since(athlete, cursor)
+        delivered = [row["id"] for row in rows]
+        tx_a.commit()
+
+    rows, cursor = get_history_since(athlete, cursor)
+    delivered += [row["id"] for row in rows]
+    rows, cursor = get_history_since(athlete, cursor)
+    delivered += [row["id"] for row in rows]
+
+    assert stored_a["id"] in delivered
+    assert len(delivered) == len(set(delivered)) == 2
+    assert sorted(delivered)[0] == stored_a["id"]
+
+
+@pytest.mark.db
+def test_since_pages_through_a_backlog(athlete):
+    from utils.db_utils import insert_health_data_batch, get_history_cursor, get_history_since
+    from utils.ingest import utc_now
+
+    cursor = get_history_cursor()
+    for i in range(5):
+        insert_health_data_batch([(athlete, 60.0 + j, 36.6, utc_now(), False, "OK") for j in range(10)])
+
+    delivered = []
+    for _ in range(10):
+        rows, cursor = get_history_since(athlete, cursor, limit=7)
+        delivered += [row["id"] for row in rows]
+    assert len(delivered) == len(set(delivered)) == 50
@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+from utils.ingest import parse_reading, parse_timestamp, MAX_ATHLETE_ID
+
+
+# ======================
+# READING VALIDATION
+# ======================
+@pytest.mark.parametrize("value", [1e20, -1e20, float("inf"), float("-inf"), float("nan"), 10 ** 30])
+def test_parse_timestamp_out_of_range(value):
+    with pytest.raises(ValueError):
+        parse_timestamp(value)
+
+
+@pytest.mark.parametrize("athlete_id", [0, -1, MAX_ATHLETE_ID + 1, 2 ** 40, True, "x"])
+def test_parse_reading_rejects_athlete_id(athlete_id):
+    with pytest.raises((ValueError, TypeError)):
+        parse_reading({"athlete_id": athlete_id, "heart_rate": 80, "temperature": 36.6})
+
+
+def test_parse_reading_accepts_max_athlete_id():
+    assert parse_reading({"athlete_id": MAX_ATHLETE_ID, "heart_rate": 80, "temperature": 36.6})[0] == MAX_ATHLETE_ID
+
+
+def test_parse_reading_rejects_non_string_alert():
+    with pytest.raises(ValueError):
+        parse_reading({"heart_rate": 80, "temperature": 36.6, "alert_message": {"text": "x"}})
+
+
+@pytest.mark.db
+def test_batch_rejects_bad_items_alone(client, athlete):
+    readings = [
+        {"athlete_id": athlete, "heart_rate": 80, "temperature": 36.6},
+        {"athlete_id": 2 ** 40, "heart_rate": 80, "temperature": 36.6},
+        {"athlete_id": athlete, "heart_rate": 81, "temperature": 36.6, "timestamp": 1e20},
+        {"athlete_id": athlete, "heart_rate": 82, "temperature": 36.6, "timestamp": float("inf")},
+        {"athlete_id": athlete, "heart_rate": 83, "temperature": 36.7},
+    ]
+    response = client.post("/api/sensor-data-batch", json={"readings": readings})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["accepted"] == 2
+    assert [r["status"] for r in body["results"]] == ["accepted", "rejected", "rejected", "rejected", "accepted"]
+
+
+# ======================
+# WRITE-BEHIND BUFFER
+# ======================
+def _row(athlete_id, hr=80.0, alert="OK"):
+    from utils.ingest import utc_now
+    return (athlete_id, hr, 36.6, utc_now(), False, alert)
+
+
+def test_submit_rejects_rows_that_do_not_fit():
+    from utils.ingest import WriteBehindBuffer
+    buffer = WriteBehindBuffer(lambda group: len(group))
+    with pytest.raises(ValueError):
+        buffer.submit(_row(2 ** 40))
+    with pytest.raises(TypeError):
+        buffer.submit(_row(1, alert=b"bytes"))
+    assert buffer.stats()["invalid"] == 2
+    assert buffer.stats()["enqueued"] == 0
+
+
+def test_poison_row_is_bisected_out():
+    import psycopg
+    from utils.ingest import WriteBehindBuffer
+
+    stored = []
+
+    def flush(group):
+        if any(row[1] == 666 for row in group):
+            raise psycopg.DataError("value refused")
+        stored.extend(group)
+        return len(group)
+
+    buffer = WriteBehindBuffer(flush, batch_size=50, flush_interval=0.05, retry_delay=0.01,
+                               data_errors=(psycopg.DataError,))
+    rows = [_row(1, hr=60.0 + i) for i in range(40)]
+    rows[17] = _row(1, hr=666)
+    for row in rows:
+        assert buffer.submit(row)
+    buffer.stop()
+
+    assert stored == [row for row in rows if row[1] != 666]
+    assert buffer.stats()["dropped_rows"] == 1
+
+
+def test_unavailable_database_is_retried_not_dropped():
+    from utils.ingest import WriteBehindBuffer
+
+    calls = []
+
+    def flush(group):
+        calls.append(len(group))
+        return False if len(calls) < 5 else len(group)
+
+    buffer = WriteBehindBuffer(flush, flush_interval=0.05, retry_delay=0.01)
+    for i in range(10):
+        buffer.submit(_row(1, hr=60.0 + i))
+    deadline = time.monotonic() + 5
+    while buffer.stats()["flushed_rows"] < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    buffer.stop()
+
+    assert buffer.stats()["flushed_rows"] == 10
+    assert buffer.stats()["dropped_rows"] == 0
+
+
+@pytest.mark.db
+def test_write_behind_stores_valid_rows_around_poison(athlete):
+    import psycopg
+    from utils.ingest import WriteBehindBuffer
+    from utils.db_utils import insert_health_data_batch
+    from utils.db_pool import get_connection, release_connection
+
+    buffer = WriteBehindBuffer(insert_health_data_batch, batch_size=100, flush_interval=0.05, retry_delay=0.01,
+                               data_errors=(ValueError, TypeError, psycopg.DataError, psycopg.IntegrityError))
+    # Passes check_row() but PostgreSQL text cannot hold NUL bytes
+    rows = [_row(athlete, hr=60.0 + i) for i in range(20)]
+    rows[7] = _row(athlete, alert="bad\x00alert")
+    for row in rows:
+        assert buffer.submit(row)
+    buffer.stop()
+
+    conn = get_connection()
+    try:
+        count = conn.execute("SELECT count(*) AS n FROM health_data WHERE athlete_id = %s", (athlete,)).fetchone()["n"]
+    finally:
+        release_connection(conn)
+    assert count == 19
+    assert buffer.stats()["dropped_rows"] == 1
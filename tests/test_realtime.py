@@ -0,0 +1,46 @@
+import json
+from datetime import datetime
+
+import pytest
+
+
+def test_reading_from_notify():
+    from utils.realtime import reading_from_notify
+    reading = reading_from_notify(json.dumps({
+        "id": 7, "athlete_id": 3, "heart_rate": 88.5, "temperature": 36.7,
+        "timestamp": "2026-10-17T02:00:00", "is_abnormal": False, "alert_message": "OK",
+    }))
+    assert reading["utc_timestamp"] == datetime(2026, 10, 17, 2)
+    assert reading["timestamp"] == "2026-10-17T10:00:00"
+    assert reading["alert_message"] == "OK"
+
+
+@pytest.mark.db
+def test_long_alert_message_is_stored_and_notified(athlete):
+    import psycopg
+    from utils.db_pool import DATABASE_URL, DB_SSLMODE, get_connection, release_connection
+    from utils.db_utils import insert_health_data_batch, NOTIFY_CHANNEL, NOTIFY_ALERT_CHARS
+    from utils.ingest import utc_now
+    from utils.realtime import reading_from_notify
+
+    alert = "é" * 20000
+    with psycopg.connect(DATABASE_URL, autocommit=True, sslmode=DB_SSLMODE) as listener:
+        listener.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        assert insert_health_data_batch([
+            (athlete, 80.0, 36.6, utc_now(), False, "OK"),
+            (athlete, 81.0, 36.6, utc_now(), True, alert),
+        ]) == 2
+        payloads = [n.payload for n in listener.notifies(timeout=2, stop_after=2)]
+
+    readings = [reading_from_notify(p) for p in payloads if json.loads(p)["athlete_id"] == athlete]
+    assert len(readings) == 2
+    assert readings[1]["alert_message"] == alert[:NOTIFY_ALERT_CHARS]
+
+    conn = get_connection()
+    try:
+        stored = conn.execute(
+            "SELECT alert_message FROM health_data WHERE athlete_id = %s AND is_abnormal", (athlete,)
+        ).fetchone()
+    finally:
+        release_connection(conn)
+    assert stored["alert_message"] == alert
@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.mark.db
+def test_invalid_index_is_rebuilt(database):
+    from utils.db_pool import get_connection, release_connection
+    from utils.db_utils import _create_indexes, HEALTH_DATA_INDEXES
+
+    conn = get_connection()
+    conn.autocommit = True
+    try:
+        conn.execute("DROP TABLE IF EXISTS index_probe")
+        conn.execute("CREATE TABLE index_probe (id INT, athlete_id INT, timestamp TIMESTAMP, is_abnormal BOOLEAN)")
+        conn.execute("INSERT INTO index_probe VALUES (1, 1, now(), true), (1, 1, now(), true)")
+        # A failed CONCURRENTLY build leaves an INVALID index behind
+        with pytest.raises(Exception):
+            conn.execute("CREATE UNIQUE INDEX CONCURRENTLY idx_health_data_athlete_ts_probe ON index_probe (id)")
+        conn.autocommit = False
+
+        assert _create_indexes(conn, "index_probe", suffix="_probe") == len(HEALTH_DATA_INDEXES)
+        rows = conn.execute("""
+            SELECT i.indisvalid, i.indisunique FROM pg_index i
+            WHERE i.indrelid = 'index_probe'::regclass
+        """).fetchall()
+        assert len(rows) == len(HEALTH_DATA_INDEXES)
+        assert all(row["indisvalid"] and not row["indisunique"] for row in rows)
+    finally:
+        conn.rollback()
+        conn.autocommit = True
+        conn.execute("DROP TABLE IF EXISTS index_probe")
+        conn.autocommit = False
+        release_connection(conn)
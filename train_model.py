@@ -8,6 +8,8 @@ import joblib
 from sklearn.tree import DecisionTreeClassifier
 import os
 
+from utils.ai_model import export_tree, COMPILED_MODEL_PATH
+
 # Training data: [heart_rate, temperature, age]
 X_train = np.array([
     # Young athletes (13-25) - Normal readings
@@ -132,6 +134,10 @@ model_path = "health_model.pkl"
 joblib.dump(model, model_path)
 print(f"💾 Model saved to: {model_path}")
 
+# Export the flattened tree used by the web app (no sklearn needed at runtime)
+export_tree(model, COMPILED_MODEL_PATH)
+print(f"💾 Compiled tree saved to: {COMPILED_MODEL_PATH}")
+
 # Test predictions
 print("\n🧪 Test predictions:")
 test_cases = [
@@ -1,20 +1,255 @@
 import os
+import json
+import bisect
 import numpy as np
-import joblib
-from sklearn.tree import DecisionTreeClassifier
+
+from utils.metrics import MODEL_LATENCY
+
+COMPILED_MODEL_PATH = "health_model.npz"
+PICKLED_MODEL_PATH = "health_model.pkl"
+
+TREE_LEAF = -1
+
+# Alert codes (bit flags) produced by AlertThresholds.classify
+ALERT_HR_HIGH = 1
+ALERT_HR_LOW = 2
+ALERT_TEMP_HIGH = 4
+ALERT_TEMP_LOW = 8
+
+# Age brackets, youngest first; each applies below its max_age (the last
+# one has no upper bound). Override with a JSON list via ALERT_THRESHOLDS_PATH.
+DEFAULT_ALERT_THRESHOLDS = [
+    {"max_age": 26, "hr_low": 45, "hr_high": 160, "temp_low": 35.8, "temp_high": 38.5},    # Young (13-25)
+    {"max_age": 41, "hr_low": 50, "hr_high": 155, "temp_low": 35.9, "temp_high": 38.2},    # Adult (26-40)
+    {"max_age": 61, "hr_low": 55, "hr_high": 145, "temp_low": 36.0, "temp_high": 37.9},    # Mature (41-60)
+    {"max_age": None, "hr_low": 60, "hr_high": 130, "temp_low": 36.1, "temp_high": 37.6},  # Senior (60+)
+]
+
+
+def export_tree(model, path=COMPILED_MODEL_PATH):
+    """
+    Flatten a fitted sklearn DecisionTreeClassifier into plain arrays
+    (feature, threshold, children, NaN routing, leaf probabilities) that
+    CompiledTree can evaluate without scikit-learn installed.
+    """
+    CompiledTree.from_sklearn(model).save(path)
+
+
+class CompiledTree:
+    """
+    Pure-NumPy evaluator for an exported decision tree.
+
+    Mirrors sklearn's tree semantics: features are compared as float32
+    values against float64 thresholds (`x <= threshold` goes left) and NaN
+    follows the node's learned missing-value branch, so probabilities match
+    DecisionTreeClassifier.predict_proba exactly. Exposes `classes_` and
+    `predict_proba` so it can stand in for the sklearn estimator.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right,
+                 missing_go_to_left, proba, classes, max_depth):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.children_left = np.asarray(children_left, dtype=np.intp)
+        self.children_right = np.asarray(children_right, dtype=np.intp)
+        self.missing_go_to_left = np.asarray(missing_go_to_left, dtype=bool)
+        self.proba = np.asarray(proba, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+
+        # Plain-list copies keep the scalar walk free of NumPy overhead.
+        self._nodes = list(zip(
+            self.feature.tolist(),
+            self.threshold.tolist(),
+            self.children_left.tolist(),
+            self.children_right.tolist(),
+            self.missing_go_to_left.tolist(),
+        ))
+        self._leaf_proba = self.proba.tolist()
+
+    @classmethod
+    def load(cls, path=COMPILED_MODEL_PATH):
+        with np.load(path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    @classmethod
+    def from_sklearn(cls, model):
+        # Leaf values normalized exactly as DecisionTreeClassifier.predict_proba does.
+        tree = model.tree_
+        values = tree.value[:, 0, :].astype(np.float64)
+        totals = values.sum(axis=1, keepdims=True)
+        totals[totals == 0.0] = 1.0
+        return cls(
+            tree.feature, tree.threshold, tree.children_left, tree.children_right,
+            getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)),
+            values / totals, model.classes_, tree.max_depth,
+        )
+
+    def save(self, path=COMPILED_MODEL_PATH):
+        np.savez(
+            path,
+            feature=self.feature.astype(np.int64),
+            threshold=self.threshold,
+            children_left=self.children_left.astype(np.int64),
+            children_right=self.children_right.astype(np.int64),
+            missing_go_to_left=self.missing_go_to_left,
+            proba=self.proba,
+            classes=self.classes_,
+            max_depth=np.int64(self.max_depth),
+        )
+
+    def leaf_index(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])
+        node = np.zeros(X.shape[0], dtype=np.intp)
+
+        for _ in range(self.max_depth):
+            left = self.children_left[node]
+            split = left != TREE_LEAF
+            if not split.any():
+                break
+            x = X[rows, self.feature[node]].astype(np.float64)
+            go_left = np.where(np.isnan(x), self.missing_go_to_left[node], x <= self.threshold[node])
+            node = np.where(split, np.where(go_left, left, self.children_right[node]), node)
+        return node
+
+    def predict_proba(self, X):
+        return self.proba[self.leaf_index(X)]
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def predict_proba_one(self, *features):
+        """Scalar walk for a single reading; returns the leaf's probability list."""
+        x32 = np.array(features, dtype=np.float32).tolist()
+        node = 0
+        while True:
+            feature, threshold, left, right, missing_left = self._nodes[node]
+            if left == TREE_LEAF:
+                return self._leaf_proba[node]
+            x = x32[feature]
+            if x != x:
+                node = left if missing_left else right
+            else:
+                node = left if x <= threshold else right
+
+
+class AlertThresholds:
+    """
+    Age-adjusted HR / temperature bounds as a sorted bracket table.
+
+    Bracket lookup is a binary search on the age edges (np.searchsorted for
+    arrays, bisect for scalars). classify() turns whole arrays of readings
+    into ALERT_* bit codes; message strings are only built for non-zero codes.
+    """
+
+    NORMAL_MESSAGE = "Normal readings"
+
+    def __init__(self, brackets=DEFAULT_ALERT_THRESHOLDS):
+        brackets = list(brackets)
+        if not brackets or brackets[-1].get("max_age") is not None:
+            raise ValueError("the last alert bracket must have max_age = null")
+
+        self.edges = [float(b["max_age"]) for b in brackets[:-1]]
+        if self.edges != sorted(self.edges):
+            raise ValueError("alert brackets must be sorted by max_age")
+
+        self.bounds = np.array(
+            [[b["hr_low"], b["hr_high"], b["temp_low"], b["temp_high"]] for b in brackets],
+            dtype=float
+        )
+        self._edges = np.array(self.edges, dtype=float)
+        self._rows = self.bounds.tolist()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get("ALERT_THRESHOLDS_PATH")
+        return cls.from_file(path) if path else cls()
+
+    def classify(self, hr, temp, age):
+        """Vectorized: alert code per reading (0 = normal)."""
+        hr = np.asarray(hr, dtype=float)
+        temp = np.asarray(temp, dtype=float)
+        rows = self.bounds[np.searchsorted(self._edges, np.asarray(age, dtype=float), side="right")]
+        hr_low, hr_high, temp_low, temp_high = np.moveaxis(rows, -1, 0)
+
+        hr_hi = hr > hr_high
+        temp_hi = temp > temp_high
+        codes = hr_hi * ALERT_HR_HIGH
+        codes |= (~hr_hi & (hr < hr_low)) * ALERT_HR_LOW
+        codes |= temp_hi * ALERT_TEMP_HIGH
+        codes |= (~temp_hi & (temp < temp_low)) * ALERT_TEMP_LOW
+        return codes.astype(np.uint8)
+
+    def classify_one(self, hr, temp, age):
+        hr_low, hr_high, temp_low, temp_high = self._rows[bisect.bisect_right(self.edges, age)]
+        code = 0
+        if hr > hr_high:
+            code |= ALERT_HR_HIGH
+        elif hr < hr_low:
+            code |= ALERT_HR_LOW
+        if temp > temp_high:
+            code |= ALERT_TEMP_HIGH
+        elif temp < temp_low:
+            code |= ALERT_TEMP_LOW
+        return code
+
+    @classmethod
+    def format(cls, code, hr, temp):
+        if not code:
+            return cls.NORMAL_MESSAGE
+
+        alerts = []
+        if code & ALERT_HR_HIGH:
+            alerts.append(f"High heart rate ({hr:.0f} BPM)")
+        elif code & ALERT_HR_LOW:
+            alerts.append(f"Low heart rate ({hr:.0f} BPM)")
+        if code & ALERT_TEMP_HIGH:
+            alerts.append(f"High temperature ({temp:.1f} °C)")
+        elif code & ALERT_TEMP_LOW:
+            alerts.append(f"Low temperature ({temp:.1f} °C)")
+        return " | ".join(alerts)
+
+    def messages(self, codes, hr, temp):
+        """Alert strings for a batch, formatting only the abnormal readings."""
+        codes = np.asarray(codes)
+        result = [self.NORMAL_MESSAGE] * codes.size
+        hr = np.asarray(hr, dtype=float)
+        temp = np.asarray(temp, dtype=float)
+        for i in np.flatnonzero(codes).tolist():
+            result[i] = self.format(int(codes[i]), float(hr[i]), float(temp[i]))
+        return result
+
 
 class HealthAIModel:
-    def __init__(self):
-        self.model_path = "health_model.pkl"
+    def __init__(self, thresholds=None):
+        self.model_path = COMPILED_MODEL_PATH
         self.model = None
-        if os.path.exists(self.model_path):
+        self.thresholds = thresholds or AlertThresholds.from_env()
+        if os.path.exists(COMPILED_MODEL_PATH) or os.path.exists(PICKLED_MODEL_PATH):
             self.load_model()
         else:
-            raise FileNotFoundError("health_model.pkl not found. Please train and save it first.")
+            raise FileNotFoundError("health_model.npz / health_model.pkl not found. Please train and save it first.")
 
     def load_model(self):
-        self.model = joblib.load(self.model_path)
+        """
+        Prefer the exported tree so the web process never imports sklearn;
+        fall back to compiling the joblib pickle in memory.
+        """
+        if os.path.exists(COMPILED_MODEL_PATH):
+            self.model_path = COMPILED_MODEL_PATH
+            self.model = CompiledTree.load(COMPILED_MODEL_PATH)
+        else:
+            import joblib
+            self.model_path = PICKLED_MODEL_PATH
+            self.model = CompiledTree.from_sklearn(joblib.load(PICKLED_MODEL_PATH))
 
+    @MODEL_LATENCY.time("predict")
     def predict(self, heart_rate, temperature, age=25):
         """
         Predict if health readings are abnormal based on age-adjusted thresholds.
@@ -28,67 +263,66 @@ class HealthAIModel:
         if not self.model:
             self.load_model()
 
-        features = np.array([[heart_rate, temperature, age]])
-        prediction = self.model.predict(features)[0]
-        proba = self.model.predict_proba(features)[0]
+        proba = self.model.predict_proba_one(heart_rate, temperature, age)
+        best = max(range(len(proba)), key=proba.__getitem__)
         
         # Get age-adjusted alert message
         alert_msg = self._alert_message(heart_rate, temperature, age)
         
         return {
-            "is_abnormal": int(prediction),
-            "confidence": float(max(proba)),
+            "is_abnormal": int(self.model.classes_[best]),
+            "confidence": float(proba[best]),
             "alert_message": alert_msg,
             "heart_rate": heart_rate,
             "temperature": temperature,
             "age": age
         }
 
+    @MODEL_LATENCY.time("predict_batch")
+    def predict_batch(self, heart_rates, temperatures, ages=25):
+        """
+        Vectorized predict() for many readings at once.
+
+        Runs a single predict_proba pass over an (n, 3) feature matrix and
+        derives the label from it. `ages` may be a scalar or an array.
+
+        Returns parallel lists: is_abnormal, confidence, alert_code,
+        alert_message.
+        """
+        if not self.model:
+            self.load_model()
+
+        hr = np.asarray(heart_rates, dtype=float).ravel()
+        temp = np.asarray(temperatures, dtype=float).ravel()
+        age = np.broadcast_to(np.asarray(ages, dtype=float), hr.shape)
+
+        if hr.size == 0:
+            return {"is_abnormal": [], "confidence": [], "alert_code": [], "alert_message": []}
+
+        proba = self.model.predict_proba(np.column_stack([hr, temp, age]))
+        best = proba.argmax(axis=1)
+        codes = self.thresholds.classify(hr, temp, age)
+
+        return {
+            "is_abnormal": self.model.classes_[best].astype(int).tolist(),
+            "confidence": proba[np.arange(hr.size), best].tolist(),
+            "alert_code": codes.tolist(),
+            "alert_message": self.thresholds.messages(codes, hr, temp)
+        }
+
+    def alert_codes(self, heart_rates, temperatures, ages=25):
+        """Vectorized age-adjusted threshold check; returns ALERT_* bit codes."""
+        return self.thresholds.classify(heart_rates, temperatures, ages)
+
     def _alert_message(self, hr, temp, age):
         """
         Generate alert messages based on age-adjusted thresholds.
         Different age groups have different normal ranges.
         """
-        alerts = []
-        
-        # Age-adjusted heart rate thresholds
-        if age < 26:  # Young athletes (13-25)
-            hr_high = 160
-            hr_low = 45
-        elif age < 41:  # Adults (26-40)
-            hr_high = 155
-            hr_low = 50
-        elif age < 61:  # Mature (41-60)
-            hr_high = 145
-            hr_low = 55
-        else:  # Seniors (60+)
-            hr_high = 130
-            hr_low = 60
-        
-        # Age-adjusted temperature thresholds
-        if age < 26:
-            temp_high = 38.5
-            temp_low = 35.8
-        elif age < 41:
-            temp_high = 38.2
-            temp_low = 35.9
-        elif age < 61:
-            temp_high = 37.9
-            temp_low = 36.0
-        else:
-            temp_high = 37.6
-            temp_low = 36.1
-        
-        # Check heart rate
-        if hr > hr_high:
-            alerts.append(f"High heart rate ({hr:.0f} BPM)")
-        elif hr < hr_low:
-            alerts.append(f"Low heart rate ({hr:.0f} BPM)")
-        
-        # Check temperature
-        if temp > temp_high:
-            alerts.append(f"High temperature ({temp:.1f} °C)")
-        elif temp < temp_low:
-            alerts.append(f"Low temperature ({temp:.1f} °C)")
-        
-        return " | ".join(alerts) if alerts else "Normal readings"
\ No newline at end of file
+        return self.thresholds.format(self.thresholds.classify_one(hr, temp, age), hr, temp)
+
+if __name__ == "__main__":
+    # Convert an existing health_model.pkl without retraining.
+    import joblib
+    export_tree(joblib.load(PICKLED_MODEL_PATH), COMPILED_MODEL_PATH)
+    print(f"💾 Compiled tree saved to: {COMPILED_MODEL_PATH}")
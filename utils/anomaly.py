@@ -0,0 +1,232 @@
+import math
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Tracked signals, in column order of the state arrays
+SIGNALS = ("heart_rate", "temperature")
+HR, TEMP = 0, 1
+
+# Trend flags (bit per signal and check)
+TREND_HR_SPIKE = 1
+TREND_HR_RISING = 2
+TREND_HR_SUSTAINED = 4
+TREND_TEMP_SPIKE = 8
+TREND_TEMP_RISING = 16
+TREND_TEMP_SUSTAINED = 32
+
+TREND_MESSAGES = {
+    TREND_HR_SPIKE: "Heart rate far outside its recent range",
+    TREND_HR_RISING: "Heart rate climbing steadily",
+    TREND_HR_SUSTAINED: "Heart rate elevated for a sustained period",
+    TREND_TEMP_SPIKE: "Temperature far outside its recent range",
+    TREND_TEMP_RISING: "Temperature climbing steadily",
+    TREND_TEMP_SUSTAINED: "Temperature elevated for a sustained period",
+}
+
+# ======================
+# DETECTOR SETTINGS
+# ======================
+MEAN_TAU = 600.0               # seconds; time constant of the EWMA mean/variance (baseline)
+LEVEL_TAU = 120.0              # seconds; time constant of the fast EWMA the rate is taken from
+RATE_TAU = 180.0               # seconds; time constant of the smoothed rate of change
+WARMUP_READINGS = 20           # no flags until an athlete has this many readings
+SPIKE_Z = 4.0                  # |x - mean| / std that counts as a spike
+RISE_PER_MIN = (2.0, 0.05)     # smoothed rise (bpm/min, °C/min) that counts as climbing
+ELEVATED = (160.0, 37.5)       # level above which a signal is "elevated"
+SUSTAIN_SECONDS = (120.0, 300.0)
+MIN_STD = (2.0, 0.05)          # floor so a flat signal does not turn noise into spikes
+
+
+def _epoch(ts):
+    """Seconds since the epoch for a naive-UTC datetime (or a number)."""
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return ts.timestamp()
+    return float(ts)
+
+
+class TrendDetector:
+    """
+    Constant-time, constant-memory trend detection per athlete.
+
+    Each athlete owns one slot in a set of NumPy arrays holding, per
+    signal: a time-aware EWMA mean and variance, the last value, a
+    smoothed rate of change (slope of a faster EWMA) and the time the signal became elevated.
+    update() touches only that slot, so the cost per reading does not
+    depend on history length or athlete count, and a slot is ~100 bytes
+    (10,000 athletes fit in about 1 MB).
+
+    Flags catch what single-reading checks miss: a value far from the
+    athlete's own recent baseline (spike), a steady climb (rising) and
+    an elevation that persists (sustained). Out-of-order readings are
+    ignored for trend purposes.
+    """
+
+    def __init__(self, capacity=1024):
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+        self.readings = 0
+        self.raised = 0
+
+    # name: (dtype, columns, initial value); one row per athlete slot
+    STATE = {
+        "count": (np.int32, None, 0),
+        "last_ts": (np.float64, None, np.nan),
+        "flags": (np.uint8, None, 0),
+        "mean": (np.float64, 2, 0.0),
+        "var": (np.float64, 2, 0.0),
+        "last": (np.float64, 2, np.nan),
+        "level": (np.float64, 2, 0.0),
+        "rate": (np.float64, 2, 0.0),
+        "elevated_since": (np.float64, 2, np.nan),
+    }
+
+    def _allocate(self, capacity):
+        for name, (dtype, columns, fill) in self.STATE.items():
+            shape = capacity if columns is None else (capacity, columns)
+            array = np.full(shape, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+
+    def _slot(self, athlete_id):
+        slot = self._slots.get(athlete_id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot >= len(self.count):
+                self._allocate(len(self.count) * 2)
+            self._slots[athlete_id] = slot
+        return slot
+
+    # ---------- update ----------
+    def update(self, athlete_id, heart_rate, temperature, timestamp):
+        """
+        Fold one reading into the athlete's state. Returns the flags that
+        became active with this reading (0 if none).
+        """
+        now = _epoch(timestamp)
+        with self._lock:
+            self.readings += 1
+            i = self._slot(athlete_id)
+            previous = self.last_ts[i]
+            if not math.isnan(previous) and now <= previous:
+                return 0
+
+            dt = 0.0 if math.isnan(previous) else now - previous
+            flags = 0
+            for s, value in ((HR, heart_rate), (TEMP, temperature)):
+                if value is None:
+                    continue
+                flags |= self._update_signal(i, s, float(value), now, dt)
+
+            self.count[i] += 1
+            self.last_ts[i] = now
+
+            if self.count[i] < WARMUP_READINGS:
+                flags = 0
+            raised = flags & ~int(self.flags[i])
+            self.flags[i] = flags
+            if raised:
+                self.raised += 1
+            return raised
+
+    def _update_signal(self, i, s, value, now, dt):
+        mean, var, last = self.mean[i, s], self.var[i, s], self.last[i, s]
+        flags = 0
+
+        if math.isnan(last):
+            self.mean[i, s] = value
+            self.level[i, s] = value
+        else:
+            # Score against the baseline before the reading moves it
+            std = max(math.sqrt(var), MIN_STD[s])
+            if abs(value - mean) / std > SPIKE_Z:
+                flags |= TREND_HR_SPIKE if s == HR else TREND_TEMP_SPIKE
+
+            # Plain running mean/variance until the EWMA window has filled
+            alpha = max(1.0 - math.exp(-dt / MEAN_TAU), 1.0 / (self.count[i] + 1))
+            diff = value - mean
+            increment = alpha * diff
+            self.mean[i, s] = mean + increment
+            self.var[i, s] = (1.0 - alpha) * (var + diff * increment)
+
+            # Slope of a fast EWMA, not of raw readings, so sensor noise
+            # does not read as a climb
+            level = self.level[i, s]
+            self.level[i, s] = level + (1.0 - math.exp(-dt / LEVEL_TAU)) * (value - level)
+            per_min = (self.level[i, s] - level) / dt * 60.0
+            beta = 1.0 - math.exp(-dt / RATE_TAU)
+            self.rate[i, s] += beta * (per_min - self.rate[i, s])
+            if self.rate[i, s] > RISE_PER_MIN[s]:
+                flags |= TREND_HR_RISING if s == HR else TREND_TEMP_RISING
+
+        self.last[i, s] = value
+
+        if value > ELEVATED[s]:
+            if math.isnan(self.elevated_since[i, s]):
+                self.elevated_since[i, s] = now
+            elif now - self.elevated_since[i, s] >= SUSTAIN_SECONDS[s]:
+                flags |= TREND_HR_SUSTAINED if s == HR else TREND_TEMP_SUSTAINED
+        else:
+            self.elevated_since[i, s] = np.nan
+
+        return flags
+
+    def update_reading(self, reading):
+        """IngestHub listener: update from a notified reading, log new trends."""
+        raised = self.update(
+            reading["athlete_id"],
+            reading["heart_rate"],
+            reading["temperature"],
+            reading["utc_timestamp"],
+        )
+        if raised:
+            print(f"⚠️ Trend for athlete {reading['athlete_id']}: {'; '.join(self.messages(raised))}")
+
+    # ---------- read ----------
+    @staticmethod
+    def messages(flags):
+        return [message for bit, message in TREND_MESSAGES.items() if flags & bit]
+
+    def state(self, athlete_id):
+        """Current rolling statistics and active trends for one athlete, or None."""
+        with self._lock:
+            i = self._slots.get(athlete_id)
+            if i is None:
+                return None
+
+            flags = int(self.flags[i])
+            signals = {}
+            for s, name in enumerate(SIGNALS):
+                since = self.elevated_since[i, s]
+                signals[name] = {
+                    "mean": round(float(self.mean[i, s]), 3),
+                    "std": round(math.sqrt(float(self.var[i, s])), 3),
+                    "last": None if math.isnan(self.last[i, s]) else float(self.last[i, s]),
+                    "rate_per_min": round(float(self.rate[i, s]), 4),
+                    "elevated_seconds": 0.0 if math.isnan(since) else round(float(self.last_ts[i] - since), 1),
+                }
+
+            return {
+                "readings": int(self.count[i]),
+                "warming_up": bool(self.count[i] < WARMUP_READINGS),
+                "last_reading": datetime.fromtimestamp(float(self.last_ts[i]), tz=timezone.utc).isoformat(),
+                "flags": flags,
+                "trends": self.messages(flags),
+                "signals": signals,
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "athletes": len(self._slots),
+                "capacity": len(self.count),
+                "state_bytes": sum(getattr(self, name).nbytes for name in self.STATE),
+                "readings": self.readings,
+                "trends_raised": self.raised,
+            }
@@ -1,28 +1,217 @@
 import os
+import time
 import secrets
-import psycopg
-from psycopg.rows import dict_row
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
+from utils.db_pool import get_connection, release_connection
+from utils.metrics import db_timed
+
+TOKEN_CACHE_TTL = float(os.environ.get("TOKEN_CACHE_TTL", 60))
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+
+# werkzeug method string, e.g. "scrypt", "scrypt:65536:8:1", "pbkdf2:sha256:600000"
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", 16))
+
 
 # ======================
-# DB CONNECTION
+# SESSION TOKEN CACHE
 # ======================
-def get_connection():
-    if not DATABASE_URL:
-        print("⚠️ DATABASE_URL not set")
-        return None
+class TokenCache:
+    """
+    Per-process TTL + LRU map of session token -> user row.
+
+    An entry lives for at most `ttl` seconds and never past the session's
+    expires_at. Other workers only see a logout or password reset once
+    their own entry ages out, so keep the TTL short.
+    """
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return dict(entry[0])
 
-    try:
-        return psycopg.connect(
-            DATABASE_URL,
-            row_factory=dict_row
+    def put(self, token, user, expires_at):
+        lifetime = min(self.ttl, (expires_at - datetime.utcnow()).total_seconds())
+        if lifetime <= 0 or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[token] = (dict(user), time.monotonic() + lifetime)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            stale = [t for t, (user, _) in self._entries.items() if user["id"] == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+_token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+
+def token_cache_stats():
+    return _token_cache.stats()
+
+
+# ======================
+# PASSWORD HASHING
+# ======================
+class PasswordHashBusy(Exception):
+    """Raised when the hashing executor's queue is full; answer 503 and retry."""
+
+
+class HashExecutor:
+    """
+    Bounded thread pool for the deliberately slow password KDFs.
+
+    At most `workers` hashes run at once per process and at most `queue`
+    more wait; beyond that callers get PasswordHashBusy immediately
+    instead of piling up. hashlib releases the GIL while hashing, so a
+    login burst holds a fixed slice of CPU and leaves the other request
+    threads (sensor ingest) running.
+    """
+
+    def __init__(self, workers=2, queue=16):
+        self.workers = max(1, workers)
+        self.queue = max(0, queue)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "waiting": 0,
+            "running": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "total_hash_ms": 0.0,
+            "max_hash_ms": 0.0,
+        }
+
+    def _pool(self):
+        # Threads do not survive a fork; each worker builds its own pool
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _timed(self, fn, args, queued_at):
+        started = time.perf_counter()
+        with self._lock:
+            wait_ms = (started - queued_at) * 1000
+            self._stats["waiting"] -= 1
+            self._stats["running"] += 1
+            self._stats["total_wait_ms"] += wait_ms
+            self._stats["max_wait_ms"] = round(max(self._stats["max_wait_ms"], wait_ms), 3)
+        try:
+            return fn(*args)
+        finally:
+            hash_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._stats["running"] -= 1
+                self._stats["completed"] += 1
+                self._stats["total_hash_ms"] += hash_ms
+                self._stats["max_hash_ms"] = round(max(self._stats["max_hash_ms"], hash_ms), 3)
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and wait for it; PasswordHashBusy if full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise PasswordHashBusy("too many password operations in progress")
+
+        try:
+            with self._lock:
+                self._stats["submitted"] += 1
+                self._stats["waiting"] += 1
+            return self._pool().submit(self._timed, fn, args, time.perf_counter()).result()
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        completed = stats["completed"]
+        stats.update(
+            workers=self.workers,
+            queue_capacity=self.queue,
+            method=PASSWORD_HASH_METHOD,
+            avg_wait_ms=round(stats.pop("total_wait_ms") / completed, 3) if completed else 0.0,
+            avg_hash_ms=round(stats.pop("total_hash_ms") / completed, 3) if completed else 0.0,
         )
-    except Exception as e:
-        print("❌ DB connection error:", e)
-        return None
+        return stats
+
+
+_hash_executor = HashExecutor(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)
+_hash_params = None
+
+
+def password_hash_stats():
+    return _hash_executor.stats()
+
+
+def hash_password(password):
+    return _hash_executor.run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(pw_hash, password):
+    return _hash_executor.run(check_password_hash, pw_hash, password)
+
+
+def needs_rehash(pw_hash):
+    """True when a stored hash was made with other parameters than PASSWORD_HASH_METHOD."""
+    global _hash_params
+    if _hash_params is None:
+        # Expand shorthand like "scrypt" to the full parameter string werkzeug stores
+        _hash_params = generate_password_hash("", PASSWORD_HASH_METHOD, salt_length=1).split("$", 1)[0]
+    return pw_hash.split("$", 1)[0] != _hash_params
 
 
 # ======================
@@ -61,42 +250,44 @@ def init_auth_db():
             conn.commit()
             return True
     finally:
-        conn.close()
+        release_connection(conn)
 
 
 # ======================
 # USER REGISTRATION
 # ======================
 def create_user(username, email, password, gender=None, age=None):
+    # Hash before borrowing a connection so slow KDFs never hold the pool
+    return _insert_user(username, email, hash_password(password), gender, age)
+
+
+@db_timed
+def _insert_user(username, email, pw_hash, gender, age):
     conn = get_connection()
     if not conn:
         return None
 
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT id FROM users WHERE email=%s", (email,))
-            if cur.fetchone():
-                return None
-
-            pw_hash = generate_password_hash(password)
-
             cur.execute("""
                 INSERT INTO users (username, email, password_hash, gender, age)
                 VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (email) DO NOTHING
                 RETURNING id
             """, (username, email, pw_hash, gender, age))
 
-            user_id = cur.fetchone()["id"]
+            row = cur.fetchone()
             conn.commit()
-            return user_id
+            return row["id"] if row else None
     finally:
-        conn.close()
+        release_connection(conn)
 
 
 # ======================
 # LOGIN
 # ======================
-def authenticate_user(email, password):
+@db_timed
+def _get_user_by_email(email):
     conn = get_connection()
     if not conn:
         return None
@@ -104,26 +295,51 @@ def authenticate_user(email, password):
     try:
         with conn.cursor() as cur:
             cur.execute("SELECT * FROM users WHERE email=%s", (email,))
-            user = cur.fetchone()
+            return cur.fetchone()
+    finally:
+        release_connection(conn)
 
-            if user and check_password_hash(user["password_hash"], password):
-                del user["password_hash"]
 
-                cur.execute(
-                    "UPDATE users SET last_login=NOW() WHERE id=%s",
-                    (user["id"],)
-                )
-                conn.commit()
+def authenticate_user(email, password):
+    """
+    Check credentials; the hash is verified with no connection borrowed.
+    A hash made with outdated parameters is replaced on successful login.
+    """
+    user = _get_user_by_email(email)
+    if not user:
+        return None
+
+    pw_hash = user.pop("password_hash")
+    if not verify_password(pw_hash, password):
+        return None
+
+    new_hash = hash_password(password) if needs_rehash(pw_hash) else None
+    return user if _record_login(user["id"], new_hash) else None
+
+
+@db_timed
+def _record_login(user_id, new_hash=None):
+    conn = get_connection()
+    if not conn:
+        return False
 
-                return user
-            return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE users
+                SET last_login = NOW(), password_hash = COALESCE(%s, password_hash)
+                WHERE id = %s
+            """, (new_hash, user_id))
+            conn.commit()
+            return True
     finally:
-        conn.close()
+        release_connection(conn)
 
 
 # ======================
 # SESSION TOKEN
 # ======================
+@db_timed
 def generate_session_token(user_id, days=30):
     conn = get_connection()
     if not conn:
@@ -142,10 +358,15 @@ def generate_session_token(user_id, days=30):
             conn.commit()
             return token
     finally:
-        conn.close()
+        release_connection(conn)
 
 
+@db_timed
 def get_user_by_token(token):
+    user = _token_cache.get(token)
+    if user:
+        return user
+
     conn = get_connection()
     if not conn:
         return None
@@ -153,35 +374,67 @@ def get_user_by_token(token):
     try:
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT u.id, u.username, u.email, u.gender, u.age
+                SELECT u.id, u.username, u.email, u.gender, u.age, s.expires_at
                 FROM users u
                 JOIN sessions s ON u.id = s.user_id
                 WHERE s.token = %s AND s.expires_at > NOW()
             """, (token,))
-            return cur.fetchone()
+            user = cur.fetchone()
+            if not user:
+                return None
+
+            expires_at = user.pop("expires_at")
+            _token_cache.put(token, user, expires_at)
+            return user
     finally:
-        conn.close()
+        release_connection(conn)
+
+
+@db_timed
+def revoke_session_token(token):
+    _token_cache.invalidate(token)
+
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE token = %s", (token,))
+            conn.commit()
+            return cur.rowcount > 0
+    finally:
+        release_connection(conn)
 
 
 # ======================
 # PASSWORD RESET
 # ======================
 def update_password(email, new_password):
+    updated = _set_password_hash(email, hash_password(new_password))
+    for user_id in updated:
+        _token_cache.invalidate_user(user_id)
+    return len(updated) > 0
+
+
+@db_timed
+def _set_password_hash(email, pw_hash):
+    """Store a new hash; returns the ids of the users updated."""
     conn = get_connection()
     if not conn:
-        return False
+        return []
 
     try:
-        pw_hash = generate_password_hash(new_password)
-
         with conn.cursor() as cur:
             cur.execute("""
                 UPDATE users
                 SET password_hash = %s
                 WHERE email = %s
+                RETURNING id
             """, (pw_hash, email))
 
+            updated = [row["id"] for row in cur.fetchall()]
             conn.commit()
-            return cur.rowcount > 0
+            return updated
     finally:
-        conn.close()
+        release_connection(conn)
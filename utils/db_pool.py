@@ -0,0 +1,153 @@
+import os
+import threading
+import atexit
+from psycopg.pq import TransactionStatus
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool, PoolTimeout
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+
+# ======================
+# POOL SETTINGS (ENV)
+# ======================
+POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 1))
+POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 10))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", 300))
+POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800))
+POOL_CHECK = os.environ.get("DB_POOL_CHECK", "1") not in ("0", "false", "no")
+DB_SSLMODE = os.environ.get("DB_SSLMODE", "require")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Pools inherited from a parent process (gunicorn --preload) are kept
+# referenced but never used or closed: their sockets belong to the parent.
+_orphaned_pools = []
+
+
+def _reset_after_fork():
+    global _pool, _pool_lock
+    if _pool is not None:
+        _orphaned_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ======================
+# POOL LIFECYCLE
+# ======================
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+
+    Each gunicorn worker builds its own pool lazily after the fork, so
+    DB_POOL_MAX_SIZE is a per-worker limit.
+    """
+    global _pool
+    if not DATABASE_URL:
+        return None
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool(
+                    DATABASE_URL,
+                    min_size=POOL_MIN_SIZE,
+                    max_size=max(POOL_MIN_SIZE, POOL_MAX_SIZE),
+                    timeout=POOL_TIMEOUT,
+                    max_idle=POOL_MAX_IDLE,
+                    max_lifetime=POOL_MAX_LIFETIME,
+                    check=ConnectionPool.check_connection if POOL_CHECK else None,
+                    kwargs={"row_factory": dict_row, "sslmode": DB_SSLMODE},
+                    name=f"athlete-{os.getpid()}",
+                    open=False,
+                )
+                pool.open(wait=False)
+                _pool = pool
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+atexit.register(close_pool)
+
+
+# ======================
+# BORROW / RETURN
+# ======================
+def get_connection():
+    """Borrow a connection from the pool; pair with release_connection()."""
+    if not DATABASE_URL:
+        print("⚠️ DATABASE_URL not set")
+        return None
+
+    try:
+        return get_pool().getconn()
+    except PoolTimeout:
+        print(f"❌ DB pool exhausted (waited {POOL_TIMEOUT}s)")
+        return None
+    except Exception as e:
+        print("❌ DB connection error:", e)
+        return None
+
+
+def release_connection(conn):
+    """Return a borrowed connection; an open transaction is rolled back."""
+    pool = _pool
+    if pool is None or conn is None:
+        if conn is not None:
+            conn.close()
+        return
+
+    try:
+        # Read-only helpers never commit; end their transaction quietly
+        # instead of letting the pool warn about it.
+        if conn.info.transaction_status != TransactionStatus.IDLE:
+            conn.rollback()
+    except Exception:
+        pass
+
+    try:
+        pool.putconn(conn)
+    except ValueError:
+        # Borrowed from a pool that has since been replaced.
+        conn.close()
+
+
+# ======================
+# STATS
+# ======================
+def pool_stats():
+    """
+    Pool counters for this worker: size, availability, waiting requests
+    and cumulative wait time, plus derived saturation and mean wait.
+    """
+    pool = _pool
+    if pool is None:
+        return {"enabled": bool(DATABASE_URL), "open": False}
+
+    stats = pool.get_stats()
+    pool_max = stats.get("pool_max", POOL_MAX_SIZE) or 1
+    in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+    requests = stats.get("requests_num", 0)
+
+    stats.update({
+        "enabled": True,
+        "open": True,
+        "pid": os.getpid(),
+        "in_use": in_use,
+        "saturation": round(in_use / pool_max, 3),
+        "avg_wait_ms": round(stats.get("requests_wait_ms", 0) / requests, 3) if requests else 0.0,
+    })
+    return stats
@@ -1,31 +1,200 @@
 import os
-import psycopg
-from psycopg.rows import dict_row
+import time
+import base64
+import secrets
+import threading
+from datetime import datetime, timedelta, timezone
+
+from psycopg.rows import tuple_row
+
+from utils.db_pool import get_connection, release_connection
+from utils.metrics import db_timed, INGEST_ROWS
+
+MAX_HISTORY_POINTS = 5000
+MAX_PAGE_SIZE = 5000
+
+# Optional native range partitioning of health_data by month
+PARTITIONING = os.environ.get("HEALTH_DATA_PARTITIONING", "").lower() in ("1", "monthly")
+PARTITION_MONTHS_AHEAD = int(os.environ.get("HEALTH_DATA_PARTITION_MONTHS_AHEAD", 3))
+
+# A pause longer than this between readings starts a new training session
+SESSION_GAP = timedelta(minutes=int(os.environ.get("SESSION_GAP_MINUTES", 10)))
+
+# Abnormal readings above this temperature are logged as critical events
+CRITICAL_TEMP = 38.5
+
+# Every stored reading is announced on this channel (see utils/realtime.py).
+# Payloads are capped at 8000 bytes, so alert messages are cut to this many
+# characters (at most 4 bytes each) in the notification, not in storage.
+NOTIFY_CHANNEL = "health_data"
+NOTIFY_ALERT_CHARS = 1000
+
+# Philippine time has no DST, so a fixed offset matches 'Asia/Manila' in SQL
+LOCAL_TZ = timezone(timedelta(hours=8), "Asia/Manila")
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
 
 # ======================
-# DB CONNECTION
+# TIME / CURSOR HELPERS
 # ======================
-def get_connection():
-    if not DATABASE_URL:
-        print("⚠️ DATABASE_URL not set")
+def parse_local_time(value):
+    """
+    Parse a from/to query value into naive UTC (the storage convention).
+    Accepts epoch seconds/ms or ISO-8601; naive ISO values are read as
+    Philippine time, like the timestamps the API returns.
+    """
+    if not value:
         return None
 
     try:
-        return psycopg.connect(
-            DATABASE_URL,
-            row_factory=dict_row,
-            sslmode="require"
-        )
-    except Exception as e:
-        print("❌ DB connection error:", e)
+        number = float(value)
+    except ValueError:
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=LOCAL_TZ)
+    else:
+        try:
+            ts = datetime.fromtimestamp(number / 1000 if number > 1e11 else number, tz=timezone.utc)
+        except (OverflowError, OSError):
+            raise ValueError(f"time out of range: {value}")
+
+    try:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    except OverflowError:
+        raise ValueError(f"time out of range: {value}")
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque keyset cursor for the (timestamp, id) position of a row."""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
         return None
 
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("invalid cursor")
+
+
+def _time_window(hours, start=None, end=None, column="timestamp"):
+    """WHERE fragment + params: explicit [start, end) bounds, else the last `hours`."""
+    if start is None:
+        sql, params = f"{column} >= NOW() - (%s || ' hours')::interval", [str(int(hours))]
+    else:
+        sql, params = f"{column} >= %s", [start]
+
+    if end is not None:
+        sql += f" AND {column} < %s"
+        params.append(end)
+    return sql, params
+
 
 # ======================
 # INIT HEALTH DATA TABLE
 # ======================
+# Every read filters by athlete and time range and orders by (timestamp, id);
+# abnormal-only views hit the partial index. The BRIN index (a few pages)
+# serves the all-athlete time-range scans of rollup rebuilds and retention.
+HEALTH_DATA_INDEXES = {
+    "idx_health_data_athlete_ts": "(athlete_id, timestamp DESC, id DESC)",
+    "idx_health_data_abnormal": "(athlete_id, timestamp DESC) WHERE is_abnormal",
+    "idx_health_data_ts_brin": "USING brin (timestamp)",
+}
+
+
+# Larger tables are indexed by `db_admin.py indexes`, not at app start
+INDEX_BOOT_MAX_ROWS = int(os.environ.get("INDEX_BOOT_MAX_ROWS", 100000))
+
+
+def _is_partitioned(cur, table="health_data"):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row) and row["relkind"] == "p"
+
+
+def _create_partitioned_table(cur, table="health_data"):
+    # A migrated table keeps drawing ids from the original SERIAL sequence.
+    cur.execute("CREATE SEQUENCE IF NOT EXISTS health_data_id_seq")
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INT NOT NULL DEFAULT nextval('health_data_id_seq'),
+            athlete_id INT NOT NULL,
+            heart_rate DECIMAL,
+            temperature DECIMAL,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            is_abnormal BOOLEAN,
+            alert_message TEXT,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+    if table == "health_data":
+        cur.execute("ALTER SEQUENCE health_data_id_seq OWNED BY health_data.id")
+
+
+def _invalid_indexes(cur, names):
+    """Those of `names` that exist but are INVALID (an interrupted CONCURRENTLY build)."""
+    cur.execute("""
+        SELECT c.relname AS name
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = ANY(%s) AND NOT i.indisvalid
+    """, (list(names),))
+    return [row["name"] for row in cur.fetchall()]
+
+
+def _missing_indexes(cur, suffix=""):
+    names = [f"{name}{suffix}" for name in HEALTH_DATA_INDEXES]
+    cur.execute("SELECT relname AS name FROM pg_class WHERE relname = ANY(%s)", (names,))
+    existing = {row["name"] for row in cur.fetchall()}
+    return [name for name in names if name not in existing] + _invalid_indexes(cur, names)
+
+
+def _create_indexes(conn, table="health_data", suffix=""):
+    """
+    Create the health_data indexes if missing. Plain tables are indexed
+    CONCURRENTLY so a first deploy against a large table does not block
+    ingest; partitioned parents do not support that and build normally.
+    An index left INVALID by an interrupted build is dropped and rebuilt
+    (IF NOT EXISTS would skip it forever). Returns the number built.
+    """
+    with conn.cursor() as cur:
+        partitioned = _is_partitioned(cur, table)
+        invalid = _invalid_indexes(cur, [f"{name}{suffix}" for name in HEALTH_DATA_INDEXES])
+    conn.commit()
+
+    concurrently = "" if partitioned else "CONCURRENTLY "
+    built = 0
+    conn.autocommit = True
+    try:
+        for name, definition in HEALTH_DATA_INDEXES.items():
+            if f"{name}{suffix}" in invalid:
+                print(f"⚠️ Rebuilding invalid index {name}{suffix}")
+                conn.execute(f"DROP INDEX {concurrently}IF EXISTS {name}{suffix}")
+            built += conn.execute("SELECT to_regclass(%s) IS NULL AS missing", (f"{name}{suffix}",)).fetchone()["missing"]
+            conn.execute(f"CREATE INDEX {concurrently}IF NOT EXISTS {name}{suffix} ON {table} {definition}")
+        return built
+    finally:
+        conn.autocommit = False
+
+
+def create_health_data_indexes():
+    """Build missing or invalid health_data indexes (`db_admin.py indexes`); returns how many."""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        return _create_indexes(conn)
+    finally:
+        release_connection(conn)
+
+
 def init_db():
     conn = get_connection()
     if not conn:
@@ -33,6 +202,11 @@ def init_db():
 
     try:
         with conn.cursor() as cur:
+            if PARTITIONING and cur.execute("SELECT to_regclass('health_data') AS t").fetchone()["t"] is None:
+                _create_partitioned_table(cur)
+                conn.commit()
+                print("✅ health_data created with monthly partitions")
+
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS health_data (
                     id SERIAL PRIMARY KEY,
@@ -44,42 +218,1051 @@ def init_db():
                     alert_message TEXT
                 )
             """)
+            partitioned = _is_partitioned(cur)
+            _create_rollup_tables(cur)
+            _create_session_table(cur)
+            _create_event_table(cur)
+            _create_team_tables(cur)
+            missing = _missing_indexes(cur)
+            # Bounded scan: is health_data small enough to index at boot?
+            small = cur.execute(
+                "SELECT NOT EXISTS (SELECT 1 FROM health_data OFFSET %s) AS small", (INDEX_BOOT_MAX_ROWS,)
+            ).fetchone()["small"]
             conn.commit()
-            return True
+
+        # init_db() runs in every worker at import: building on a large
+        # table would outlast the boot timeout, so that is left to the CLI
+        if missing and small:
+            _create_indexes(conn)
+        elif missing:
+            print(f"⚠️ health_data indexes missing or invalid: {', '.join(missing)}; "
+                  "run `python db_admin.py indexes`")
+
+        if partitioned:
+            _ensure_partitions(conn)
+        elif PARTITIONING:
+            print("⚠️ health_data is not partitioned; run `python db_admin.py migrate-partitions`")
+        return True
     finally:
-        conn.close()
+        release_connection(conn)
+
+
+# ======================
+# TIME PARTITIONS (OPTIONAL)
+# ======================
+def _month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def _ensure_partitions(conn, table="health_data", since=None, months_ahead=None):
+    """
+    Create monthly partitions from `since` (default: this month) through
+    `months_ahead` future months. Existing ones are skipped; a month whose
+    rows already landed in the default partition is reported and skipped.
+    """
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    today = datetime.now(timezone.utc).date()
+    month = _month_start(since or today)
+    last = _month_start(today, months_ahead)
+    created = 0
+
+    conn.autocommit = True
+    try:
+        while month <= last:
+            upper = _month_start(month, 1)
+            name = f"{table}_y{month.year}m{month.month:02d}"
+            try:
+                cur = conn.execute("SELECT to_regclass(%s) AS t", (name,))
+                if cur.fetchone()["t"] is None:
+                    conn.execute(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{month}') TO ('{upper}')"
+                    )
+                    created += 1
+            except Exception as e:
+                print(f"⚠️ Partition {name} not created:", e)
+            month = upper
+    finally:
+        conn.autocommit = False
+    return created
+
+
+def ensure_health_data_partitions(months_ahead=None):
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            partitioned = _is_partitioned(cur)
+        conn.commit()
+        return _ensure_partitions(conn, months_ahead=months_ahead) if partitioned else 0
+    finally:
+        release_connection(conn)
+
+
+def start_partition_maintenance(interval=86400):
+    """Daemon thread that keeps future partitions created (one per worker, idempotent)."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                ensure_health_data_partitions()
+            except Exception as e:
+                print("❌ Partition maintenance error:", e)
+
+    thread = threading.Thread(target=run, name="partition-maintenance", daemon=True)
+    thread.start()
+    return thread
+
+
+def migrate_health_data_to_partitioned(batch_size=50000):
+    """
+    Move an existing plain health_data table into a partitioned one.
+
+    Rows are copied in id order, one committed batch at a time, so ingest
+    keeps running and an interrupted run resumes where it stopped. The
+    final catch-up and the table swap happen under a lock that blocks
+    writes (not reads) only for that last step. Ids keep coming from the
+    same sequence. The old table is kept as health_data_unpartitioned.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            if _is_partitioned(cur):
+                print("✅ health_data is already partitioned")
+                return 0
+
+            _create_partitioned_table(cur, "health_data_new")
+            first = cur.execute("SELECT min(timestamp) AS ts FROM health_data").fetchone()["ts"]
+            last_id = cur.execute("SELECT COALESCE(max(id), 0) AS id FROM health_data_new").fetchone()["id"]
+            conn.commit()
+
+        _ensure_partitions(conn, "health_data_new", since=first.date() if first else None)
+        _create_indexes(conn, "health_data_new", suffix="_new")
+
+        copy_sql = """
+            WITH moved AS (
+                INSERT INTO health_data_new
+                SELECT id, athlete_id, heart_rate, temperature,
+                       COALESCE(timestamp, 'epoch'::timestamp), is_abnormal, alert_message
+                FROM health_data
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+                RETURNING id
+            )
+            SELECT count(*) AS n, max(id) AS last_id FROM moved
+        """
+        moved = 0
+        while True:
+            with conn.cursor() as cur:
+                batch = cur.execute(copy_sql, (last_id, batch_size)).fetchone()
+                conn.commit()
+            if not batch["n"]:
+                break
+            moved += batch["n"]
+            last_id = batch["last_id"]
+            print(f"   copied {moved} rows (id <= {last_id})")
+
+        with conn.cursor() as cur:
+            cur.execute("LOCK TABLE health_data IN SHARE ROW EXCLUSIVE MODE")
+            while True:
+                batch = cur.execute(copy_sql, (last_id, batch_size)).fetchone()
+                if not batch["n"]:
+                    break
+                moved += batch["n"]
+                last_id = batch["last_id"]
+
+            cur.execute("ALTER TABLE health_data RENAME TO health_data_unpartitioned")
+            renames = [("health_data_new_pkey", "health_data_pkey")]
+            renames += [(f"{name}_new", name) for name in HEALTH_DATA_INDEXES]
+            for new_name, name in renames:
+                cur.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_unpartitioned")
+                cur.execute(f"ALTER INDEX {new_name} RENAME TO {name}")
+            cur.execute("ALTER TABLE health_data_new RENAME TO health_data")
+            cur.execute("ALTER SEQUENCE health_data_id_seq OWNED BY health_data.id")
+
+            # Partition names follow the parent table name.
+            cur.execute("""
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'health_data'::regclass
+            """)
+            for row in cur.fetchall():
+                if row["relname"].startswith("health_data_new_"):
+                    renamed = row["relname"].replace("health_data_new_", "health_data_", 1)
+                    cur.execute(f"ALTER TABLE {row['relname']} RENAME TO {renamed}")
+            conn.commit()
+
+        # Writers that queued on the lock still resolve to the old table;
+        # sweep anything they added after the swap.
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO health_data
+                SELECT id, athlete_id, heart_rate, temperature,
+                       COALESCE(timestamp, 'epoch'::timestamp), is_abnormal, alert_message
+                FROM health_data_unpartitioned
+                WHERE id > %s
+            """, (last_id,))
+            moved += cur.rowcount
+            conn.commit()
+
+        print(f"✅ health_data migrated to monthly partitions ({moved} rows)")
+        return moved
+    finally:
+        release_connection(conn)
+
+
+# ======================
+# ROLLUPS (PER-MINUTE / PER-HOUR)
+# ======================
+# table -> (date_trunc unit, bucket width in seconds), finest first
+ROLLUPS = {
+    "health_data_1m": ("minute", 60),
+    "health_data_1h": ("hour", 3600),
+}
+
+
+def _create_rollup_tables(cur):
+    for table in ROLLUPS:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                athlete_id INT NOT NULL,
+                bucket TIMESTAMP NOT NULL,
+                reading_count INT NOT NULL,
+                hr_min DECIMAL,
+                hr_max DECIMAL,
+                hr_sum DECIMAL,
+                temp_min DECIMAL,
+                temp_max DECIMAL,
+                temp_sum DECIMAL,
+                abnormal_count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (athlete_id, bucket)
+            )
+        """)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket_brin ON {table} USING brin (bucket)")
+
+
+def _rollup_upsert_sql(table, unit, source):
+    """
+    Fold rows of `source` into `table`. Sums and counts add up and min/max
+    widen, so the same readings can be applied in any number of batches.
+    Groups are written in key order so concurrent batches lock alike.
+    """
+    return f"""
+        INSERT INTO {table} AS r
+            (athlete_id, bucket, reading_count, hr_min, hr_max, hr_sum,
+             temp_min, temp_max, temp_sum, abnormal_count)
+        SELECT athlete_id, date_trunc('{unit}', timestamp), count(*),
+               min(heart_rate), max(heart_rate), sum(heart_rate),
+               min(temperature), max(temperature), sum(temperature),
+               count(*) FILTER (WHERE is_abnormal)
+        FROM {source}
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (athlete_id, bucket) DO UPDATE SET
+            reading_count = r.reading_count + EXCLUDED.reading_count,
+            hr_min = LEAST(r.hr_min, EXCLUDED.hr_min),
+            hr_max = GREATEST(r.hr_max, EXCLUDED.hr_max),
+            hr_sum = r.hr_sum + EXCLUDED.hr_sum,
+            temp_min = LEAST(r.temp_min, EXCLUDED.temp_min),
+            temp_max = GREATEST(r.temp_max, EXCLUDED.temp_max),
+            temp_sum = r.temp_sum + EXCLUDED.temp_sum,
+            abnormal_count = r.abnormal_count + EXCLUDED.abnormal_count
+    """
+
+
+def rebuild_rollups(start, end=None, chunk=timedelta(days=1)):
+    """
+    Recompute rollups from raw rows in [start, end), one committed chunk at
+    a time. Used to backfill readings stored before rollups existed. Only
+    run it over ranges whose raw rows are still present.
+    """
+    end = end or datetime.now(timezone.utc).replace(tzinfo=None)
+    conn = get_connection()
+    if not conn:
+        return None
+
+    buckets = 0
+    try:
+        lower = start
+        while lower < end:
+            upper = min(lower + chunk, end)
+            with conn.cursor() as cur:
+                for table, (unit, _) in ROLLUPS.items():
+                    cur.execute(
+                        f"DELETE FROM {table} WHERE bucket >= date_trunc('{unit}', %s::timestamp) AND bucket < %s",
+                        (lower, upper)
+                    )
+                    cur.execute(_rollup_upsert_sql(table, unit, f"""(
+                        SELECT * FROM health_data
+                        WHERE timestamp >= date_trunc('{unit}', %(lower)s::timestamp)
+                        AND timestamp < %(upper)s
+                    ) AS raw"""), {"lower": lower, "upper": upper})
+                    buckets += cur.rowcount
+            conn.commit()
+            lower = upper
+        return buckets
+    finally:
+        release_connection(conn)
+
+
+def _rollup_for(resolution):
+    """Coarsest rollup whose bucket width still satisfies `resolution` seconds."""
+    best = None
+    for table, (_, width) in ROLLUPS.items():
+        if width <= resolution:
+            best = (table, width)
+    return best
+
+
+@db_timed
+def get_history_rollup(athlete_id, resolution, hours=24, start=None, end=None):
+    """
+    History at `resolution` seconds per point, answered from the coarsest
+    rollup table that is fine enough and re-bucketed to the requested
+    width. Each point carries avg/min/max for both signals, the reading
+    count and the abnormal count. Returns None when no rollup is fine
+    enough (resolution below one minute).
+    """
+    source = _rollup_for(resolution)
+    if not source:
+        return None
+
+    table, width = source
+    resolution = max(int(resolution), width)
+    # Buckets wider than an hour line up with Philippine local midnight
+    offset = int(LOCAL_TZ.utcoffset(None).total_seconds())
+    window, params = _time_window(hours, start, end, column="bucket")
+
+    conn = get_connection()
+    if not conn:
+        return []
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT
+                    to_timestamp(floor((extract(epoch FROM bucket) + %s) / %s) * %s - %s)
+                        AT TIME ZONE 'Asia/Manila' AS timestamp,
+                    sum(reading_count) AS reading_count,
+                    round(sum(hr_sum) / sum(reading_count), 2) AS heart_rate,
+                    min(hr_min) AS hr_min,
+                    max(hr_max) AS hr_max,
+                    round(sum(temp_sum) / sum(reading_count), 2) AS temperature,
+                    min(temp_min) AS temp_min,
+                    max(temp_max) AS temp_max,
+                    sum(abnormal_count) AS abnormal_count
+                FROM {table}
+                WHERE athlete_id = %s
+                AND {window}
+                GROUP BY 1
+                ORDER BY 1 ASC
+            """, [offset, resolution, resolution, offset, athlete_id] + params)
+
+            result = []
+            for row in cur:
+                row["timestamp"] = row["timestamp"].isoformat()
+                row["reading_count"] = int(row["reading_count"])
+                row["abnormal_count"] = int(row["abnormal_count"])
+                row["is_abnormal"] = row["abnormal_count"] > 0
+                result.append(row)
+
+            return result
+    except Exception as e:
+        print("❌ get_history_rollup error:", e)
+        return []
+    finally:
+        release_connection(conn)
+
+
+# ======================
+# RETENTION / COMPACTION
+# ======================
+# Days each resolution is kept; 0 keeps it forever. Raw rows only go once
+# the rollups hold them, so older history stays available per minute,
+# then per hour (see get_history_rollup()).
+RETENTION_DAYS = {
+    "health_data": int(os.environ.get("RETENTION_RAW_DAYS", 14)),
+    "health_data_1m": int(os.environ.get("RETENTION_MINUTE_DAYS", 183)),
+    "health_data_1h": int(os.environ.get("RETENTION_HOUR_DAYS", 0)),
+}
+# Raw rows are compacted and deleted one committed chunk at a time
+RETENTION_CHUNK_HOURS = int(os.environ.get("RETENTION_CHUNK_HOURS", 1))
+RETENTION_PAUSE = float(os.environ.get("RETENTION_PAUSE", 0.1))
+# Longest a partition drop may wait for (and so hold up) queries on health_data
+RETENTION_LOCK_TIMEOUT = os.environ.get("RETENTION_LOCK_TIMEOUT", "2s")
+
+
+def _check_retention(days):
+    kept = [days[table] for table in ("health_data", *ROLLUPS)]
+    for finer, coarser in zip(kept, kept[1:]):
+        if coarser and (finer == 0 or finer > coarser):
+            raise ValueError("each rollup must be kept at least as long as the finer data it summarizes")
+
+
+def _compact_chunk(cur, lower, upper):
+    """
+    Fold raw rows of [lower, upper) into rollup buckets that do not exist
+    yet. Ingest maintains the rollups as it stores rows, so this only
+    fills buckets of rows loaded some other way; existing buckets (which
+    may already summarize deleted rows) are never rebuilt. Returns the
+    number of buckets written.
+    """
+    buckets = 0
+    for table, (unit, _) in ROLLUPS.items():
+        cur.execute(_rollup_upsert_sql(table, unit, f"""(
+            SELECT h.* FROM health_data h
+            WHERE h.timestamp >= %(lower)s AND h.timestamp < %(upper)s
+            AND NOT EXISTS (
+                SELECT 1 FROM {table} x
+                WHERE x.athlete_id = h.athlete_id AND x.bucket = date_trunc('{unit}', h.timestamp)
+            )
+        ) AS raw"""), {"lower": lower, "upper": upper})
+        buckets += cur.rowcount
+    return buckets
+
+
+def _expired_partitions(cur, cutoff, table="health_data"):
+    """[(name, lower, upper)] of monthly partitions lying wholly before `cutoff`."""
+    cur.execute("""
+        SELECT c.relname AS name
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+    """, (table,))
+
+    expired = []
+    for row in cur.fetchall():
+        try:
+            # Named by _ensure_partitions(): <table>_y2025m01
+            year, month = row["name"][len(table) + 2:].split("m")
+            lower = datetime(int(year), int(month), 1)
+        except ValueError:
+            continue
+        upper = _month_start(lower, 1)
+        if upper <= cutoff:
+            expired.append((row["name"], lower, upper))
+    return expired
+
+
+def _drop_partition(conn, name, table="health_data"):
+    """
+    Detach and drop one partition. Detaching locks the parent briefly, so
+    the lock wait is capped; a busy table is retried on the next run.
+    """
+    try:
+        conn.execute(f"SET LOCAL lock_timeout = '{RETENTION_LOCK_TIMEOUT}'")
+        conn.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        conn.execute(f"DROP TABLE {name}")
+        conn.commit()
+        return 1
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️ Partition {name} not dropped:", e)
+        return 0
+
+
+def _delete_expired_rollups(conn, table, cutoff, pause):
+    """Delete rollup buckets older than `cutoff`, one committed day at a time."""
+    deleted = 0
+    lower = conn.execute(f"SELECT min(bucket) AS b FROM {table} WHERE bucket < %s", (cutoff,)).fetchone()["b"]
+    while lower is not None and lower < cutoff:
+        upper = min(lower + timedelta(days=1), cutoff)
+        deleted += conn.execute(f"DELETE FROM {table} WHERE bucket >= %s AND bucket < %s", (lower, upper)).rowcount
+        conn.commit()
+        lower = upper
+        time.sleep(pause)
+    conn.commit()
+    return deleted
+
+
+def _next_raw(conn, lower, cutoff):
+    """Hour of the oldest raw row in [lower, cutoff), or None; skips empty stretches."""
+    row = conn.execute(
+        "SELECT min(timestamp) AS t FROM health_data WHERE timestamp >= %s AND timestamp < %s",
+        (lower or datetime.min, cutoff)
+    ).fetchone()
+    conn.commit()
+    return row["t"] and row["t"].replace(minute=0, second=0, microsecond=0)
+
+
+def apply_retention(days=None, chunk_hours=RETENTION_CHUNK_HOURS, max_chunks=None, pause=RETENTION_PAUSE):
+    """
+    Enforce RETENTION_DAYS (or `days`, overriding some of its entries).
+
+    Raw rows older than the raw cutoff are handled oldest first in
+    `chunk_hours` chunks, each its own short transaction: missing rollup
+    buckets are filled from the chunk's rows, then the rows are deleted.
+    Only old rows are touched, so ingest is never blocked, and a stopped
+    run loses nothing. A monthly partition lying wholly before the cutoff
+    is compacted the same way but then dropped instead of deleted row by
+    row. Expired rollup buckets are deleted a day at a time.
+
+    `max_chunks` bounds one run (a partition being dropped is always
+    finished); the next run carries on. Runs are serialized across
+    workers with an advisory lock; a run that finds it taken returns
+    {"skipped": True}. Returns the counts and seconds spent, or None
+    when no connection is available.
+    """
+    days = {**RETENTION_DAYS, **(days or {})}
+    _check_retention(days)
+    chunk = timedelta(hours=max(1, int(chunk_hours)))
+    started = time.perf_counter()
+    report = {
+        "skipped": False,
+        "complete": True,
+        "chunks": 0,
+        "buckets_compacted": 0,
+        "raw_deleted": 0,
+        "partitions_dropped": 0,
+        "rollups_deleted": {table: 0 for table in ROLLUPS},
+    }
+
+    conn = get_connection()
+    if not conn:
+        return None
+
+    locked = False
+    try:
+        locked = conn.execute(
+            "SELECT pg_try_advisory_lock(hashtext('health_data_retention')) AS ok"
+        ).fetchone()["ok"]
+        conn.commit()
+        if not locked:
+            report["skipped"] = True
+            return report
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if days["health_data"]:
+            # Whole hours, so an hour's rows are compacted together
+            cutoff = (now - timedelta(days=days["health_data"])).replace(minute=0, second=0, microsecond=0)
+            with conn.cursor() as cur:
+                expired = _expired_partitions(cur, cutoff) if _is_partitioned(cur) else []
+            conn.commit()
+
+            current = None
+            lower = _next_raw(conn, None, cutoff)
+            while lower is not None:
+                partition = next((p for p in expired if p[1] <= lower < p[2]), None)
+                if max_chunks is not None and report["chunks"] >= max_chunks and (partition is None or partition != current):
+                    report["complete"] = False
+                    break
+
+                # Chunks never straddle a month, i.e. a partition boundary
+                upper = min(lower + chunk, cutoff, _month_start(datetime(lower.year, lower.month, 1), 1))
+                with conn.cursor() as cur:
+                    report["buckets_compacted"] += _compact_chunk(cur, lower, upper)
+                    if partition is None:
+                        cur.execute("DELETE FROM health_data WHERE timestamp >= %s AND timestamp < %s", (lower, upper))
+                        report["raw_deleted"] += cur.rowcount
+                conn.commit()
+                report["chunks"] += 1
+                current = partition
+                lower = _next_raw(conn, upper, cutoff)
+
+                if partition and (lower is None or lower >= partition[2]):
+                    report["partitions_dropped"] += _drop_partition(conn, partition[0])
+                    expired.remove(partition)
+                time.sleep(pause)
+
+            # Expired partitions the loop never entered hold no rows
+            if report["complete"]:
+                for name, _, _ in expired:
+                    report["partitions_dropped"] += _drop_partition(conn, name)
+
+        for table in ROLLUPS:
+            if days[table]:
+                report["rollups_deleted"][table] = _delete_expired_rollups(
+                    conn, table, now - timedelta(days=days[table]), pause
+                )
+        return report
+    finally:
+        report["seconds"] = round(time.perf_counter() - started, 2)
+        if locked:
+            try:
+                conn.rollback()
+                conn.execute("SELECT pg_advisory_unlock(hashtext('health_data_retention'))")
+                conn.commit()
+            except Exception:
+                pass
+        release_connection(conn)
+
+
+def start_retention_job(interval=86400):
+    """Daemon thread that applies the retention policy every `interval` seconds."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                report = apply_retention()
+                if report and not report["skipped"]:
+                    print(f"🧹 Retention: {report}")
+            except Exception as e:
+                print("❌ Retention job error:", e)
+
+    thread = threading.Thread(target=run, name="retention", daemon=True)
+    thread.start()
+    return thread
+
+
+# ======================
+# TRAINING SESSIONS
+# ======================
+SESSION_COLUMNS = """
+    athlete_id, start_time, end_time, reading_count, hr_min, hr_max, hr_sum,
+    temp_min, temp_max, temp_sum, abnormal_count
+"""
+
+
+def _create_session_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS training_sessions (
+            id SERIAL PRIMARY KEY,
+            athlete_id INT NOT NULL,
+            start_time TIMESTAMP NOT NULL,
+            end_time TIMESTAMP NOT NULL,
+            reading_count INT NOT NULL,
+            hr_min DECIMAL,
+            hr_max DECIMAL,
+            hr_sum DECIMAL,
+            temp_min DECIMAL,
+            temp_max DECIMAL,
+            temp_sum DECIMAL,
+            abnormal_count INT NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_training_sessions_athlete_start
+        ON training_sessions (athlete_id, start_time DESC)
+    """)
+
+
+def _session_runs(rows):
+    """
+    Split stored rows into per-athlete runs of readings no more than
+    SESSION_GAP apart, each summarized like a training_sessions row.
+    """
+    runs = []
+    for row in sorted(rows, key=lambda r: (r["athlete_id"], r["timestamp"])):
+        run = runs[-1] if runs else None
+        if run is None or run["athlete_id"] != row["athlete_id"] or row["timestamp"] - run["end_time"] > SESSION_GAP:
+            run = {
+                "athlete_id": row["athlete_id"],
+                "start_time": row["timestamp"],
+                "end_time": row["timestamp"],
+                "reading_count": 0,
+                "hr": [],
+                "temp": [],
+                "abnormal_count": 0,
+            }
+            runs.append(run)
+
+        run["end_time"] = row["timestamp"]
+        run["reading_count"] += 1
+        run["abnormal_count"] += bool(row["is_abnormal"])
+        if row["heart_rate"] is not None:
+            run["hr"].append(row["heart_rate"])
+        if row["temperature"] is not None:
+            run["temp"].append(row["temperature"])
+
+    for run in runs:
+        hr, temp = run.pop("hr"), run.pop("temp")
+        run.update(
+            hr_min=min(hr, default=None), hr_max=max(hr, default=None), hr_sum=sum(hr) if hr else None,
+            temp_min=min(temp, default=None), temp_max=max(temp, default=None), temp_sum=sum(temp) if temp else None,
+        )
+    return runs
+
+
+def _update_sessions(cur, rows):
+    """
+    Fold freshly stored rows into training_sessions, in the caller's
+    transaction. Each run of readings is merged with every session it
+    comes within SESSION_GAP of: the oldest such session absorbs the run
+    (and any sessions a late reading bridges), the rest are deleted, and
+    a run touching no session starts a new one. Ingest for one athlete is
+    serialized by a transaction-level advisory lock so concurrent batches
+    cannot open duplicate sessions.
+    """
+    runs = _session_runs(rows)
+    for athlete_id in sorted({run["athlete_id"] for run in runs}):
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('training_sessions'), %s)", (athlete_id,))
+
+    for run in runs:
+        cur.execute(f"""
+            WITH hit AS (
+                SELECT * FROM training_sessions
+                WHERE athlete_id = %(athlete_id)s
+                AND start_time <= %(end_time)s::timestamp + %(gap)s
+                AND end_time >= %(start_time)s::timestamp - %(gap)s
+            ),
+            merged AS (
+                SELECT
+                    min(id) AS id,
+                    LEAST(min(start_time), %(start_time)s) AS start_time,
+                    GREATEST(max(end_time), %(end_time)s) AS end_time,
+                    sum(reading_count) + %(reading_count)s AS reading_count,
+                    LEAST(min(hr_min), %(hr_min)s) AS hr_min,
+                    GREATEST(max(hr_max), %(hr_max)s) AS hr_max,
+                    COALESCE(sum(hr_sum), 0) + COALESCE(%(hr_sum)s, 0) AS hr_sum,
+                    LEAST(min(temp_min), %(temp_min)s) AS temp_min,
+                    GREATEST(max(temp_max), %(temp_max)s) AS temp_max,
+                    COALESCE(sum(temp_sum), 0) + COALESCE(%(temp_sum)s, 0) AS temp_sum,
+                    sum(abnormal_count) + %(abnormal_count)s AS abnormal_count
+                FROM hit
+            ),
+            dropped AS (
+                DELETE FROM training_sessions
+                WHERE id IN (SELECT id FROM hit) AND id <> (SELECT id FROM merged)
+            ),
+            updated AS (
+                UPDATE training_sessions t SET
+                    start_time = m.start_time,
+                    end_time = m.end_time,
+                    reading_count = m.reading_count,
+                    hr_min = m.hr_min, hr_max = m.hr_max, hr_sum = m.hr_sum,
+                    temp_min = m.temp_min, temp_max = m.temp_max, temp_sum = m.temp_sum,
+                    abnormal_count = m.abnormal_count
+                FROM merged m
+                WHERE t.id = m.id
+            )
+            INSERT INTO training_sessions ({SESSION_COLUMNS})
+            SELECT %(athlete_id)s, %(start_time)s, %(end_time)s, %(reading_count)s,
+                   %(hr_min)s, %(hr_max)s, %(hr_sum)s,
+                   %(temp_min)s, %(temp_max)s, %(temp_sum)s, %(abnormal_count)s
+            WHERE NOT EXISTS (SELECT 1 FROM hit)
+        """, {**run, "gap": SESSION_GAP})
+
+
+def rebuild_training_sessions(athlete_id=None):
+    """
+    Recompute training_sessions from raw readings with a gaps-and-islands
+    pass (a new session wherever the pause exceeds SESSION_GAP). Used to
+    backfill history stored before sessions existed. Session ids change.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    where, params = ("WHERE athlete_id = %(athlete_id)s", {"athlete_id": athlete_id}) if athlete_id else ("", {})
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM training_sessions {where}", params)
+            cur.execute(f"""
+                WITH marked AS (
+                    SELECT athlete_id, timestamp, heart_rate, temperature, is_abnormal,
+                        CASE WHEN timestamp - lag(timestamp) OVER w <= %(gap)s THEN 0 ELSE 1 END AS starts
+                    FROM health_data
+                    {where}
+                    WINDOW w AS (PARTITION BY athlete_id ORDER BY timestamp)
+                ),
+                grouped AS (
+                    SELECT *, sum(starts) OVER (PARTITION BY athlete_id ORDER BY timestamp
+                                                ROWS UNBOUNDED PRECEDING) AS session
+                    FROM marked
+                )
+                INSERT INTO training_sessions ({SESSION_COLUMNS})
+                SELECT athlete_id, min(timestamp), max(timestamp), count(*),
+                       min(heart_rate), max(heart_rate), sum(heart_rate),
+                       min(temperature), max(temperature), sum(temperature),
+                       count(*) FILTER (WHERE is_abnormal)
+                FROM grouped
+                GROUP BY athlete_id, session
+                ORDER BY athlete_id, min(timestamp)
+            """, {**params, "gap": SESSION_GAP})
+            sessions = cur.rowcount
+            conn.commit()
+            return sessions
+    finally:
+        release_connection(conn)
+
+
+def _session_summary(row):
+    del row["raw_start"], row["raw_end"]
+    count = row.pop("reading_count")
+    hr_sum, temp_sum = row.pop("hr_sum"), row.pop("temp_sum")
+    row.update(
+        start_time=row["start_time"].isoformat(),
+        end_time=row["end_time"].isoformat(),
+        reading_count=count,
+        duration_min=round(row.pop("duration_s") / 60, 1),
+        avg_hr=round(hr_sum / count, 2) if hr_sum is not None else None,
+        avg_temp=round(temp_sum / count, 2) if temp_sum is not None else None,
+    )
+    return row
+
+
+SESSION_SELECT = """
+    SELECT
+        id,
+        start_time AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS start_time,
+        end_time AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS end_time,
+        extract(epoch FROM end_time - start_time)::float AS duration_s,
+        reading_count, hr_min, hr_max, hr_sum, temp_min, temp_max, temp_sum, abnormal_count,
+        start_time AS raw_start,
+        end_time AS raw_end
+    FROM training_sessions
+"""
+
+
+@db_timed
+def get_training_sessions(athlete_id, days=30, limit=50):
+    """Newest-first session summaries that started within the last `days`."""
+    conn = get_connection()
+    if not conn:
+        return []
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SESSION_SELECT + """
+                WHERE athlete_id = %s
+                AND start_time >= NOW() - (%s || ' days')::interval
+                ORDER BY start_time DESC
+                LIMIT %s
+            """, (athlete_id, str(int(days)), max(1, min(int(limit), 500))))
+            return [_session_summary(row) for row in cur]
+    except Exception as e:
+        print("❌ get_training_sessions error:", e)
+        return []
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def get_training_session(athlete_id, session_id):
+    """
+    (summary, (start, end)) for one session, the bounds in naive UTC for
+    fetching its readings; None if it does not exist or is not the
+    athlete's.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SESSION_SELECT + " WHERE athlete_id = %s AND id = %s", (athlete_id, session_id))
+            row = cur.fetchone()
+            if not row:
+                return None
+            bounds = (row["raw_start"], row["raw_end"])
+            return _session_summary(row), bounds
+    except Exception as e:
+        print("❌ get_training_session error:", e)
+        return None
+    finally:
+        release_connection(conn)
+
+
+# ======================
+# ABNORMAL EVENT LOG
+# ======================
+def _create_event_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS health_events (
+            id SERIAL PRIMARY KEY,
+            reading_id INT NOT NULL UNIQUE,
+            athlete_id INT NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            heart_rate DECIMAL,
+            temperature DECIMAL,
+            severity TEXT NOT NULL,
+            alert_message TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_health_events_athlete_ts
+        ON health_events (athlete_id, timestamp DESC, id DESC)
+    """)
+
+
+def _event_insert_sql(source):
+    """Log the abnormal rows of `source` (health_data-shaped, with id) as events."""
+    return f"""
+        INSERT INTO health_events
+            (reading_id, athlete_id, timestamp, heart_rate, temperature, severity, alert_message)
+        SELECT id, athlete_id, timestamp, heart_rate, temperature,
+               CASE WHEN temperature > {CRITICAL_TEMP} THEN 'critical' ELSE 'warning' END,
+               alert_message
+        FROM {source}
+        WHERE is_abnormal
+        ON CONFLICT (reading_id) DO NOTHING
+    """
+
+
+def rebuild_health_events(start=None):
+    """Backfill events for abnormal readings (optionally since `start`) that lack one."""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            if start is None:
+                cur.execute(_event_insert_sql("health_data"))
+            else:
+                cur.execute(_event_insert_sql(
+                    "(SELECT * FROM health_data WHERE timestamp >= %s) AS raw"
+                ), (start,))
+            events = cur.rowcount
+            conn.commit()
+            return events
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def get_health_events(athlete_id, hours=168, start=None, end=None, severity=None, limit=50, cursor=None):
+    """
+    One page of the athlete's abnormal events, newest first, continuing
+    before `cursor` (a decoded (timestamp, id) pair). Returns
+    (events, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    window, params = _time_window(hours, start, end)
+    if severity:
+        window += " AND severity = %s"
+        params.append(severity)
+    if cursor:
+        window += " AND (timestamp, id) < (%s, %s)"
+        params += list(cursor)
+
+    conn = get_connection()
+    if not conn:
+        return [], None
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                    id,
+                    reading_id,
+                    heart_rate,
+                    temperature,
+                    severity,
+                    alert_message,
+                    timestamp AS raw_timestamp,
+                    timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS timestamp
+                FROM health_events
+                WHERE athlete_id = %s
+                AND {window}
+                ORDER BY health_events.timestamp DESC, id DESC
+                LIMIT %s
+            """.format(window=window), [athlete_id] + params + [limit + 1])
+
+            rows = cur.fetchall()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]["raw_timestamp"], rows[-1]["id"])
+
+            for row in rows:
+                del row["raw_timestamp"]
+                row["timestamp"] = row["timestamp"].isoformat()
+
+            return rows, next_cursor
+    except Exception as e:
+        print("❌ get_health_events error:", e)
+        return [], None
+    finally:
+        release_connection(conn)
 
 
 # ======================
 # INSERT SENSOR DATA
 # ======================
+def _insert_columns(cur, athlete_ids, heart_rates, temperatures, timestamps, abnormal, alerts):
+    """
+    Insert readings given as parallel column lists in a single statement.
+    A None timestamp falls back to CURRENT_TIMESTAMP, like the column
+    default. The per-minute and per-hour rollups and the abnormal event
+    log are updated by the same statement, and each row is NOTIFYed on
+    NOTIFY_CHANNEL (delivered at commit) with its alert message truncated
+    to NOTIFY_ALERT_CHARS. Returns the stored rows (with id and timestamp).
+    """
+    # Take the transaction id before any row draws an id (see get_history_since())
+    cur.execute("SELECT pg_current_xact_id()")
+    # Array parameters must be homogeneous; devices send ints and floats alike
+    heart_rates = [None if v is None else float(v) for v in heart_rates]
+    temperatures = [None if v is None else float(v) for v in temperatures]
+    rollups = ",\n".join(
+        f"{table}_upsert AS ({_rollup_upsert_sql(table, unit, 'inserted')})"
+        for table, (unit, _) in ROLLUPS.items()
+    )
+    cur.execute(f"""
+        WITH inserted AS (
+            INSERT INTO health_data
+            (athlete_id, heart_rate, temperature, timestamp, is_abnormal, alert_message)
+            SELECT r.athlete_id, r.heart_rate, r.temperature,
+                   COALESCE(r.ts, CURRENT_TIMESTAMP), r.is_abnormal, r.alert_message
+            FROM unnest(
+                %s::int[], %s::numeric[], %s::numeric[],
+                %s::timestamp[], %s::boolean[], %s::text[]
+            ) AS r(athlete_id, heart_rate, temperature, ts, is_abnormal, alert_message)
+            RETURNING id, athlete_id, heart_rate, temperature, timestamp, is_abnormal, alert_message
+        ),
+        {rollups},
+        events AS ({_event_insert_sql('inserted')})
+        SELECT i.* FROM inserted i
+        CROSS JOIN LATERAL (SELECT pg_notify('{NOTIFY_CHANNEL}', json_build_object(
+            'id', i.id, 'athlete_id', i.athlete_id, 'heart_rate', i.heart_rate,
+            'temperature', i.temperature, 'timestamp', i.timestamp, 'is_abnormal', i.is_abnormal,
+            'alert_message', left(i.alert_message, {NOTIFY_ALERT_CHARS})
+        )::text)) AS notified
+    """, (athlete_ids, heart_rates, temperatures, timestamps, abnormal, alerts))
+    return cur.fetchall()
+
+
 def insert_health_data(athlete_id, heart_rate, temperature, pred):
+    return insert_health_data_batch([(
+        athlete_id,
+        heart_rate,
+        temperature,
+        None,
+        bool(pred.get("is_abnormal")),
+        pred.get("alert_message")
+    )]) == 1
+
+
+def insert_health_data_batch(rows):
+    """Persist many readings in one round trip and one commit; returns the row count."""
+    if not rows:
+        return 0
+    return insert_health_data_columns(*[list(col) for col in zip(*rows)])
+
+
+@db_timed
+def insert_health_data_columns(athlete_ids, heart_rates, temperatures, timestamps, abnormal, alerts):
+    """insert_health_data_batch() for readings already split into column lists."""
+    if not athlete_ids:
+        return 0
+
     conn = get_connection()
     if not conn:
         return False
 
     try:
         with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO health_data
-                (athlete_id, heart_rate, temperature, is_abnormal, alert_message)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                athlete_id,
-                heart_rate,
-                temperature,
-                bool(pred.get("is_abnormal")),
-                pred.get("alert_message")
-            ))
+            stored = _insert_columns(cur, athlete_ids, heart_rates, temperatures, timestamps, abnormal, alerts)
+            _update_sessions(cur, stored)
             conn.commit()
-            return True
+            INGEST_ROWS.inc(amount=len(stored))
+            return len(stored)
     finally:
-        conn.close()
+        release_connection(conn)
 
 
 # ======================
 # GET LATEST DATA (PH TIME)
 # ======================
+@db_timed
 def get_latest_data(athlete_id):
     conn = get_connection()
     if not conn:
@@ -89,6 +1272,7 @@ def get_latest_data(athlete_id):
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT
+                    id,
                     heart_rate,
                     temperature,
                     is_abnormal,
@@ -96,7 +1280,7 @@ def get_latest_data(athlete_id):
                     timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS timestamp
                 FROM health_data
                 WHERE athlete_id = %s
-                ORDER BY timestamp DESC
+                ORDER BY health_data.timestamp DESC, id DESC
                 LIMIT 1
             """, (athlete_id,))
 
@@ -109,13 +1293,71 @@ def get_latest_data(athlete_id):
             row["is_abnormal"] = bool(row["is_abnormal"])
             return row
     finally:
-        conn.close()
+        release_connection(conn)
 
 
 # ======================
 # GET HISTORY DATA (PH TIME) ✅ FIXED
 # ======================
-def get_history_data(athlete_id, hours=24):
+def _history_raw_query(athlete_id, hours=24, start=None, end=None):
+    """(sql, params) of every reading in the window, timestamps in UTC."""
+    window, params = _time_window(hours, start, end)
+    return """
+        SELECT heart_rate, temperature, is_abnormal, alert_message, timestamp
+        FROM health_data
+        WHERE athlete_id = %s
+        AND {window}
+    """.format(window=window), [athlete_id] + params
+
+
+def _history_downsampled_query(athlete_id, hours=24, points=500, start=None, end=None):
+    """
+    (sql, params) of the min/max-per-bucket downsampling done in SQL: the
+    window is cut into equal time buckets and each bucket keeps only its
+    extreme rows (max/min heart rate, max/min temperature, first abnormal
+    reading). Windows that already fit in `points`, and sparse buckets,
+    are returned untouched. At most `points` rows come back, whatever the
+    window length, and spikes survive because extremes are always kept.
+    """
+    points = max(5, min(int(points), MAX_HISTORY_POINTS))
+    buckets = points // 5
+    window, params = _time_window(hours, start, end, column="h.timestamp")
+
+    return """
+        WITH bounds AS (
+            SELECT
+                extract(epoch FROM COALESCE(%s::timestamp, (NOW() - (%s || ' hours')::interval)::timestamp)) AS lo,
+                extract(epoch FROM COALESCE(%s::timestamp, NOW()::timestamp)) AS hi
+        ),
+        bucketed AS (
+            SELECT
+                h.heart_rate, h.temperature, h.is_abnormal, h.alert_message, h.timestamp,
+                width_bucket(extract(epoch FROM h.timestamp), b.lo, b.hi + 1, %s) AS bucket
+            FROM health_data h, bounds b
+            WHERE h.athlete_id = %s
+            AND {window}
+        ),
+        ranked AS (
+            SELECT *,
+                count(*) OVER () AS total,
+                count(*) OVER (PARTITION BY bucket) AS n,
+                row_number() OVER (PARTITION BY bucket ORDER BY heart_rate DESC NULLS LAST, is_abnormal DESC NULLS LAST, timestamp) AS hr_max,
+                row_number() OVER (PARTITION BY bucket ORDER BY heart_rate ASC, is_abnormal DESC NULLS LAST, timestamp) AS hr_min,
+                row_number() OVER (PARTITION BY bucket ORDER BY temperature DESC NULLS LAST, is_abnormal DESC NULLS LAST, timestamp) AS temp_max,
+                row_number() OVER (PARTITION BY bucket ORDER BY temperature ASC, is_abnormal DESC NULLS LAST, timestamp) AS temp_min,
+                row_number() OVER (PARTITION BY bucket ORDER BY is_abnormal DESC NULLS LAST, timestamp) AS abnormal_first
+            FROM bucketed
+        )
+        SELECT heart_rate, temperature, is_abnormal, alert_message, timestamp
+        FROM ranked
+        WHERE total <= %s OR n <= 5
+        OR hr_max = 1 OR hr_min = 1 OR temp_max = 1 OR temp_min = 1
+        OR (abnormal_first = 1 AND is_abnormal)
+    """.format(window=window), [start, str(int(hours)), end, buckets, athlete_id] + params + [points]
+
+
+def _history_rows(name, sql, params):
+    """Run a history query as a list of row dicts in Philippine time."""
     conn = get_connection()
     if not conn:
         return []
@@ -129,32 +1371,394 @@ def get_history_data(athlete_id, hours=24):
                     is_abnormal,
                     alert_message,
                     timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS timestamp
+                FROM ({sql}) AS r
+                ORDER BY r.timestamp ASC
+            """.format(sql=sql), params)
+
+            result = []
+            for row in cur:
+                row = dict(row)
+                row["timestamp"] = row["timestamp"].isoformat()
+                row["is_abnormal"] = bool(row["is_abnormal"])
+                result.append(row)
+
+            return result
+    except Exception as e:
+        print(f"❌ {name} error:", e)
+        return []
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def get_history_data(athlete_id, hours=24, points=None, start=None, end=None):
+    if points:
+        return get_history_downsampled(athlete_id, hours, points, start, end)
+
+    return _history_rows("get_history_data", *_history_raw_query(athlete_id, hours, start, end))
+
+
+# ======================
+# GET HISTORY DATA, DOWNSAMPLED (PH TIME)
+# ======================
+@db_timed
+def get_history_downsampled(athlete_id, hours=24, points=500, start=None, end=None):
+    """At most `points` rows of the window; see _history_downsampled_query()."""
+    return _history_rows(
+        "get_history_downsampled", *_history_downsampled_query(athlete_id, hours, points, start, end)
+    )
+
+
+# ======================
+# GET HISTORY DATA, COLUMNAR JSON
+# ======================
+@db_timed
+def get_history_columns(athlete_id, hours=24, points=None, start=None, end=None):
+    """
+    The get_history_data() window as one ready-to-send JSON document of
+    parallel arrays:
+
+        {"t": [epoch ms, UTC], "hr": [...], "temp": [...], "abn": [...]}
+
+    PostgreSQL aggregates and serializes the arrays, so no per-row dicts,
+    datetime formatting or Decimal conversion happen in Python. Returns
+    the JSON text, or None when no connection is available.
+    """
+    if points:
+        sql, params = _history_downsampled_query(athlete_id, hours, points, start, end)
+    else:
+        sql, params = _history_raw_query(athlete_id, hours, start, end)
+
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            # Stored timestamps are naive UTC, so epoch needs no zone shift
+            cur.execute("""
+                SELECT json_build_object(
+                    't', COALESCE(array_agg((extract(epoch FROM r.timestamp) * 1000)::bigint ORDER BY r.timestamp), '{{}}'),
+                    'hr', COALESCE(array_agg(r.heart_rate ORDER BY r.timestamp), '{{}}'),
+                    'temp', COALESCE(array_agg(r.temperature ORDER BY r.timestamp), '{{}}'),
+                    'abn', COALESCE(array_agg(COALESCE(r.is_abnormal, FALSE) ORDER BY r.timestamp), '{{}}')
+                )::text AS body
+                FROM ({sql}) AS r
+            """.format(sql=sql), params)
+            return cur.fetchone()["body"]
+    except Exception as e:
+        print("❌ get_history_columns error:", e)
+        return None
+    finally:
+        release_connection(conn)
+
+
+# ======================
+# GET HISTORY PAGE (KEYSET PAGINATION)
+# ======================
+@db_timed
+def get_history_page(athlete_id, hours=24, start=None, end=None, limit=1000, cursor=None):
+    """
+    One page of raw history ordered by (timestamp, id), continuing after
+    `cursor` (a decoded (timestamp, id) pair). The keyset condition is
+    served by the index order, so deep pages cost no more than the first.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    window, params = _time_window(hours, start, end)
+    if cursor:
+        window += " AND (timestamp, id) > (%s, %s)"
+        params += list(cursor)
+
+    conn = get_connection()
+    if not conn:
+        return [], None
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                    id,
+                    heart_rate,
+                    temperature,
+                    is_abnormal,
+                    alert_message,
+                    timestamp AS raw_timestamp,
+                    timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS timestamp
                 FROM health_data
                 WHERE athlete_id = %s
-                AND timestamp >= NOW() - (%s || ' hours')::interval
-                ORDER BY timestamp ASC
-            """, (athlete_id, str(int(hours))))
+                AND {window}
+                ORDER BY health_data.timestamp ASC, id ASC
+                LIMIT %s
+            """.format(window=window), [athlete_id] + params + [limit + 1])
 
             rows = cur.fetchall()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]["raw_timestamp"], rows[-1]["id"])
+
             result = []
+            for row in rows:
+                del row["raw_timestamp"]
+                row["timestamp"] = row["timestamp"].isoformat()
+                row["is_abnormal"] = bool(row["is_abnormal"])
+                result.append(row)
+
+            return result, next_cursor
+    except Exception as e:
+        print("❌ get_history_page error:", e)
+        return [], None
+    finally:
+        release_connection(conn)
+
+
+# ======================
+# HISTORY EXPORT (SERVER-SIDE CURSOR)
+# ======================
+EXPORT_BATCH_SIZE = 5000
+
+# Row layout yielded by HistoryExport
+EXPORT_COLUMNS = ("id", "raw_timestamp", "timestamp", "heart_rate", "temperature", "is_abnormal", "alert_message")
+
+
+class HistoryExport:
+    """
+    An athlete's raw history in (timestamp, id) order, read through a
+    named (server-side) cursor `batch_size` rows per round trip, so memory
+    stays flat whatever the range. Iterating yields lists of EXPORT_COLUMNS
+    tuples; `timestamp` is Philippine time and `raw_timestamp` the stored
+    UTC value (for encode_cursor).
+
+    The pooled connection and its transaction are held until the export
+    is exhausted or close() is called; always close it, even when it was
+    never iterated.
+    """
+
+    def __init__(self, conn, cur, batch_size):
+        self._conn = conn
+        self._cur = cur
+        self._batch_size = batch_size
+        self.rows = 0
+
+    def __iter__(self):
+        try:
+            while True:
+                rows = self._cur.fetchmany(self._batch_size)
+                if not rows:
+                    return
+                self.rows += len(rows)
+                yield rows
+        finally:
+            self.close()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            self._cur.close()
+        except Exception:
+            pass
+        release_connection(conn)
+
+
+def open_history_export(athlete_id, start=None, end=None, cursor=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Declare the export cursor for [start, end) (either may be None for an
+    open range), resuming after `cursor`, a decoded (timestamp, id) pair
+    as used by get_history_page(). Returns a HistoryExport, or None when
+    no connection is available.
+    """
+    conditions, params = ["athlete_id = %s"], [athlete_id]
+    if start is not None:
+        conditions.append("timestamp >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("timestamp < %s")
+        params.append(end)
+    if cursor:
+        conditions.append("(timestamp, id) > (%s, %s)")
+        params += list(cursor)
+
+    conn = get_connection()
+    if not conn:
+        return None
 
+    try:
+        cur = conn.cursor(name="history_export", row_factory=tuple_row)
+        cur.execute("""
+            SELECT
+                id,
+                timestamp AS raw_timestamp,
+                timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS timestamp,
+                heart_rate,
+                temperature,
+                COALESCE(is_abnormal, FALSE),
+                alert_message
+            FROM health_data
+            WHERE {conditions}
+            ORDER BY health_data.timestamp ASC, id ASC
+        """.format(conditions=" AND ".join(conditions)), params)
+        return HistoryExport(conn, cur, batch_size)
+    except Exception as e:
+        print("❌ open_history_export error:", e)
+        release_connection(conn)
+        return None
+
+
+# ======================
+# GET HISTORY DELTA (SINCE CURSOR)
+# ======================
+# Ids are drawn when a row is inserted but become visible when its
+# transaction commits, so "ids above the last one seen" misses a row whose
+# transaction commits after a later id. Delta cursors therefore follow
+# transaction ids: a poll delivers the rows of transactions below its
+# snapshot's xmin (all of them finished) that the previous poll did not.
+#
+# A since cursor is "xid.id.xmax.seq.floor":
+#   (xid, id)  rows ordered by (transaction id, id) after this are new
+#   xmax, seq  snapshot xmax of the poll, and the id sequence read before it
+#   floor      no undelivered row has an id at or below it (keeps the scan
+#              on the id index)
+# _insert_columns() takes its transaction id before drawing ids, so a
+# transaction started after a snapshot only draws ids above the sequence
+# value read before that snapshot.
+MAX_ID = 2 ** 31 - 1
+
+
+def _encode_since(xid, row_id, xmax, seq, floor):
+    return f"{xid}.{row_id}.{xmax}.{seq}.{floor}"
+
+
+def parse_since_cursor(value):
+    """
+    (xid, id, xmax, seq, floor) of a since cursor; raises ValueError.
+    A bare id (the cursor of earlier releases) is read as an id floor.
+    """
+    parts = value.split(".") if value else []
+    if not parts or not all(part.isdigit() for part in parts):
+        raise ValueError("invalid since cursor")
+    if len(parts) == 1:
+        # Never advances the floor on its own; the next cursor is exact
+        return 0, 0, 2 ** 63 - 1, 0, min(int(parts[0]), MAX_ID)
+    if len(parts) != 5:
+        raise ValueError("invalid since cursor")
+    return tuple(int(part) for part in parts)
+
+
+def _snapshot(cur):
+    """Id sequence position, then xmin/xmax of a snapshot taken after reading it."""
+    cur.execute("""
+        SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END AS seq
+        FROM health_data_id_seq
+    """)
+    seq = cur.fetchone()["seq"]
+    cur.execute("""
+        SELECT pg_snapshot_xmin(s)::text::bigint AS xmin, pg_snapshot_xmax(s)::text::bigint AS xmax
+        FROM pg_current_snapshot() AS s
+    """)
+    row = cur.fetchone()
+    return seq, row["xmin"], row["xmax"]
+
+
+@db_timed
+def get_history_cursor():
+    """
+    Since cursor for a later get_history_since() call. Take it before
+    loading a window so nothing falls between.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            seq, xmin, xmax = _snapshot(cur)
+            # Transactions still running may hold any id: scan from the
+            # start of the window once, until a poll can bound them
+            floor = seq if xmin == xmax else 0
+            return _encode_since(xmin - 1, MAX_ID, xmax, seq, floor)
+    except Exception as e:
+        print("❌ get_history_cursor error:", e)
+        return None
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def get_history_since(athlete_id, since, hours=24, limit=MAX_PAGE_SIZE):
+    """
+    Rows stored after the `since` cursor (see get_history_cursor()), in
+    commit order. Late readings carrying an older device timestamp are
+    still delivered, and so is a row whose transaction committed after
+    a later id was delivered. Returns (rows, cursor).
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    after_xid, after_id, prev_xmax, prev_seq, floor = parse_since_cursor(since)
+    window, params = _time_window(hours, column="h.timestamp")
+
+    conn = get_connection()
+    if not conn:
+        return [], None
+
+    try:
+        with conn.cursor() as cur:
+            seq, xmin, xmax = _snapshot(cur)
+
+            # Full transaction id of each row's 32-bit xmin, below xmax
+            cur.execute("""
+                SELECT * FROM (
+                    SELECT
+                        h.id,
+                        h.heart_rate,
+                        h.temperature,
+                        h.is_abnormal,
+                        h.alert_message,
+                        h.timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS timestamp,
+                        %s - ((%s %% 4294967296) - h.xmin::text::bigint + 4294967296) %% 4294967296 AS xid
+                    FROM health_data h
+                    WHERE h.id > %s
+                    AND h.athlete_id = %s
+                    AND {window}
+                ) AS r
+                WHERE (xid, id) > (%s, %s) AND xid < %s
+                ORDER BY xid, id
+                LIMIT %s
+            """.format(window=window), [xmax, xmax, floor, athlete_id] + params + [after_xid, after_id, xmin, limit + 1])
+
+            rows = cur.fetchall()
+            if len(rows) > limit:
+                # Resume after the last row; later transactions may hold
+                # ids down to the current floor, so it stays
+                rows = rows[:limit]
+                cursor = _encode_since(rows[-1]["xid"], rows[-1]["id"], prev_xmax, floor, floor)
+            else:
+                # Transactions at or above xmin began after the previous
+                # snapshot (xmin >= prev_xmax) and so drew ids above prev_seq
+                if xmin >= prev_xmax:
+                    floor = max(floor, prev_seq)
+                cursor = _encode_since(xmin - 1, MAX_ID, xmax, seq, floor)
+
+            result = []
             for row in rows:
-                row = dict(row)
+                del row["xid"]
                 row["timestamp"] = row["timestamp"].isoformat()
                 row["is_abnormal"] = bool(row["is_abnormal"])
                 result.append(row)
 
-            return result
+            return result, cursor
     except Exception as e:
-        print("❌ get_history_data error:", e)
-        return []
+        print("❌ get_history_since error:", e)
+        return [], None
     finally:
-        conn.close()
+        release_connection(conn)
 
 
 # ======================
 # GET ABNORMAL TEMP HISTORY (PH TIME) ✅ FIXED
 # ======================
+@db_timed
 def get_abnormal_temp_history(athlete_id, threshold=37.5, hours=168):
     conn = get_connection()
     if not conn:
@@ -187,4 +1791,238 @@ def get_abnormal_temp_history(athlete_id, threshold=37.5, hours=168):
         print("❌ get_abnormal_temp_history error:", e)
         return []
     finally:
-        conn.close()
+        release_connection(conn)
+
+
+# ======================
+# TEAMS (COACH VIEW)
+# ======================
+# Rolling window of the per-athlete summary in the team overview
+TEAM_SUMMARY_MINUTES = 60
+
+
+def _create_team_tables(cur):
+    # Athletes join with the coach's join code; a coach cannot add
+    # athletes (and see their readings) on their own.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS teams (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            coach_id INT NOT NULL,
+            join_code TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_teams_coach ON teams (coach_id)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS team_members (
+            team_id INT NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+            athlete_id INT NOT NULL,
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (team_id, athlete_id)
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_team_members_athlete ON team_members (athlete_id)")
+
+
+@db_timed
+def create_team(coach_id, name):
+    """New team coached by `coach_id`; returns {id, name, join_code} or None."""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO teams (name, coach_id, join_code)
+                VALUES (%s, %s, %s)
+                RETURNING id, name, join_code
+            """, (name, coach_id, secrets.token_urlsafe(6)))
+            team = cur.fetchone()
+            conn.commit()
+            return team
+    except Exception as e:
+        print("❌ create_team error:", e)
+        return None
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def get_team(team_id):
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, name, coach_id FROM teams WHERE id = %s", (team_id,))
+            return cur.fetchone()
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def get_teams(user_id):
+    """Teams the user coaches (with join code) or belongs to, with member counts."""
+    conn = get_connection()
+    if not conn:
+        return []
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                    t.id,
+                    t.name,
+                    CASE WHEN t.coach_id = %(user)s THEN 'coach' ELSE 'member' END AS role,
+                    CASE WHEN t.coach_id = %(user)s THEN t.join_code END AS join_code,
+                    (SELECT count(*) FROM team_members c WHERE c.team_id = t.id) AS members
+                FROM teams t
+                WHERE t.coach_id = %(user)s
+                OR EXISTS (SELECT 1 FROM team_members m WHERE m.team_id = t.id AND m.athlete_id = %(user)s)
+                ORDER BY t.name, t.id
+            """, {"user": user_id})
+            return cur.fetchall()
+    except Exception as e:
+        print("❌ get_teams error:", e)
+        return []
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def join_team(athlete_id, join_code):
+    """Add the athlete to the team with this code; returns {id, name} or None."""
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, name FROM teams WHERE join_code = %s", (join_code,))
+            team = cur.fetchone()
+            if team:
+                cur.execute("""
+                    INSERT INTO team_members (team_id, athlete_id) VALUES (%s, %s)
+                    ON CONFLICT DO NOTHING
+                """, (team["id"], athlete_id))
+                conn.commit()
+            return team
+    except Exception as e:
+        print("❌ join_team error:", e)
+        return None
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def remove_team_member(team_id, athlete_id, requested_by):
+    """The team's coach may remove anyone, an athlete only themselves. Returns True if removed."""
+    conn = get_connection()
+    if not conn:
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM team_members m
+                USING teams t
+                WHERE t.id = m.team_id
+                AND m.team_id = %(team)s AND m.athlete_id = %(athlete)s
+                AND (t.coach_id = %(user)s OR m.athlete_id = %(user)s)
+            """, {"team": team_id, "athlete": athlete_id, "user": requested_by})
+            conn.commit()
+            return cur.rowcount > 0
+    except Exception as e:
+        print("❌ remove_team_member error:", e)
+        return False
+    finally:
+        release_connection(conn)
+
+
+@db_timed
+def get_team_overview(team_id, minutes=TEAM_SUMMARY_MINUTES):
+    """
+    Every member's latest reading and a rolling summary of the last
+    `minutes`, in one set-based query: a LATERAL index probe per athlete
+    for the latest row (no DISTINCT ON sort over the team's history) and
+    a second one over the per-minute rollups for the summary, so the cost
+    grows with team size, not with how many readings are stored.
+    Returns a list of {athlete_id, name, latest, summary}, or None when
+    no connection is available.
+    """
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT
+                    m.athlete_id,
+                    u.username AS name,
+                    l.id,
+                    l.heart_rate::float8 AS heart_rate,
+                    l.temperature::float8 AS temperature,
+                    l.is_abnormal,
+                    l.alert_message,
+                    l.timestamp AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Manila' AS timestamp,
+                    s.readings,
+                    s.hr_avg, s.hr_min, s.hr_max,
+                    s.temp_avg, s.temp_min, s.temp_max,
+                    s.abnormal
+                FROM team_members m
+                LEFT JOIN users u ON u.id = m.athlete_id
+                LEFT JOIN LATERAL (
+                    SELECT h.id, h.heart_rate, h.temperature, h.is_abnormal, h.alert_message, h.timestamp
+                    FROM health_data h
+                    WHERE h.athlete_id = m.athlete_id
+                    ORDER BY h.timestamp DESC, h.id DESC
+                    LIMIT 1
+                ) AS l ON TRUE
+                LEFT JOIN LATERAL (
+                    SELECT
+                        COALESCE(sum(r.reading_count), 0)::int AS readings,
+                        round(sum(r.hr_sum) / NULLIF(sum(r.reading_count), 0), 2)::float8 AS hr_avg,
+                        min(r.hr_min)::float8 AS hr_min,
+                        max(r.hr_max)::float8 AS hr_max,
+                        round(sum(r.temp_sum) / NULLIF(sum(r.reading_count), 0), 2)::float8 AS temp_avg,
+                        min(r.temp_min)::float8 AS temp_min,
+                        max(r.temp_max)::float8 AS temp_max,
+                        COALESCE(sum(r.abnormal_count), 0)::int AS abnormal
+                    FROM health_data_1m r
+                    WHERE r.athlete_id = m.athlete_id
+                    AND r.bucket >= NOW() - make_interval(mins => %s)
+                ) AS s ON TRUE
+                WHERE m.team_id = %s
+                ORDER BY m.athlete_id
+            """, (int(minutes), team_id))
+
+            athletes = []
+            for row in cur:
+                latest = None
+                if row["id"] is not None:
+                    latest = {
+                        "id": row["id"],
+                        "heart_rate": row["heart_rate"],
+                        "temperature": row["temperature"],
+                        "is_abnormal": bool(row["is_abnormal"]),
+                        "alert_message": row["alert_message"],
+                        "timestamp": row["timestamp"].isoformat(),
+                    }
+                athletes.append({
+                    "athlete_id": row["athlete_id"],
+                    "name": row["name"],
+                    "latest": latest,
+                    "summary": {key: row[key] for key in (
+                        "readings", "hr_avg", "hr_min", "hr_max", "temp_avg", "temp_min", "temp_max", "abnormal"
+                    )},
+                })
+            return athletes
+    except Exception as e:
+        print("❌ get_team_overview error:", e)
+        return None
+    finally:
+        release_connection(conn)
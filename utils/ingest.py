@@ -0,0 +1,397 @@
+import os
+import math
+import time
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+MAX_BATCH_SIZE = 1000
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+# health_data.athlete_id is an INT
+MAX_ATHLETE_ID = 2 ** 31 - 1
+
+
+# ======================
+# RAW (DEVICE) CLASSIFICATION
+# ======================
+def classify_raw(hr, temp, alert="OK"):
+    """Threshold check used for device readings that bypass the AI model."""
+    return {
+        "is_abnormal": hr == 0 or temp < 30 or temp > 37.5,
+        "alert_message": alert
+    }
+
+
+# ======================
+# READING VALIDATION
+# ======================
+def utc_now():
+    """Current time as a naive UTC datetime, matching health_data.timestamp."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def parse_timestamp(value):
+    """
+    Normalize a device timestamp to a naive UTC datetime (the storage
+    convention of health_data). Accepts epoch seconds, epoch milliseconds
+    or ISO-8601; naive ISO strings are taken as UTC. None means "now".
+    """
+    if value is None or value == "":
+        return None
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = value / 1000 if value > 1e11 else value
+        try:
+            ts = datetime.fromtimestamp(seconds, tz=timezone.utc)
+        except (OverflowError, OSError):
+            raise ValueError("timestamp is out of range")
+    elif isinstance(value, str):
+        ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+    else:
+        raise ValueError("timestamp must be epoch seconds/ms or ISO-8601")
+
+    if ts > datetime.now(timezone.utc) + MAX_CLOCK_SKEW:
+        raise ValueError("timestamp is in the future")
+
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _finite(value, name):
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number")
+    return number
+
+
+def parse_athlete_id(value):
+    """An athlete id as stored in health_data; raises ValueError/TypeError."""
+    if isinstance(value, bool):
+        raise TypeError("athlete_id must be an integer")
+    athlete_id = int(value)
+    if not 0 < athlete_id <= MAX_ATHLETE_ID:
+        raise ValueError("athlete_id is out of range")
+    return athlete_id
+
+
+def parse_reading(item, default_athlete_id=1):
+    """
+    Validate one reading object from a batch payload.
+    Returns (athlete_id, heart_rate, temperature, timestamp, alert_message)
+    or raises ValueError/TypeError/KeyError with a client-facing reason.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("reading must be an object")
+
+    if "heart_rate" not in item or "temperature" not in item:
+        raise ValueError("heart_rate and temperature are required")
+
+    alert = item.get("alert_message", "OK")
+    if alert is not None and not isinstance(alert, str):
+        raise ValueError("alert_message must be a string")
+
+    return (
+        parse_athlete_id(item.get("athlete_id", default_athlete_id)),
+        _finite(item["heart_rate"], "heart_rate"),
+        _finite(item["temperature"], "temperature"),
+        parse_timestamp(item.get("timestamp")),
+        alert,
+    )
+
+
+# ======================
+# BINARY READINGS
+# ======================
+# Content type of the compact device format: N fixed 24-byte little-endian
+# records, struct layout "<IqffB3x":
+#   uint32  athlete_id   (0 = default athlete 1)
+#   int64   timestamp    epoch milliseconds, UTC (0 = time of receipt)
+#   float32 heart_rate
+#   float32 temperature
+#   uint8   flags        bit 0: the device raised an alert
+#   3 bytes padding
+BINARY_CONTENT_TYPE = "application/x-athlete-readings"
+READING_DTYPE = np.dtype([
+    ("athlete_id", "<u4"),
+    ("timestamp", "<i8"),
+    ("heart_rate", "<f4"),
+    ("temperature", "<f4"),
+    ("flags", "u1"),
+    ("pad", "V3"),
+])
+FLAG_DEVICE_ALERT = 1
+DEVICE_ALERT_MESSAGE = "Device alert"
+
+# Storage column order shared by decode_readings() and the bulk insert
+READING_COLUMNS = ("athlete_id", "heart_rate", "temperature", "timestamp", "is_abnormal", "alert_message")
+
+
+def decode_readings(payload):
+    """
+    Decode a binary payload into storage columns without copying it per
+    record. Returns (columns, rejected) where columns is the dict
+    (athlete_id, heart_rate, temperature, timestamp, is_abnormal,
+    alert_message) of lists for the valid records and rejected lists the
+    indexes of records with non-finite values or future timestamps.
+    Raises ValueError for a malformed or oversized payload.
+    """
+    if len(payload) % READING_DTYPE.itemsize:
+        raise ValueError(f"payload is not a whole number of {READING_DTYPE.itemsize}-byte records")
+
+    records = np.frombuffer(payload, dtype=READING_DTYPE)
+    if not len(records):
+        raise ValueError("payload holds no records")
+    if len(records) > MAX_BATCH_SIZE:
+        raise ValueError(f"batch exceeds {MAX_BATCH_SIZE} readings")
+
+    # float32 on the wire; two decimals is the sensors' precision
+    hr = np.round(records["heart_rate"].astype(np.float64), 2)
+    temp = np.round(records["temperature"].astype(np.float64), 2)
+
+    now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    ts_ms = np.where(records["timestamp"] == 0, now_ms, records["timestamp"])
+    max_ms = now_ms + int(MAX_CLOCK_SKEW.total_seconds() * 1000)
+
+    valid = np.isfinite(hr) & np.isfinite(temp) & (ts_ms > 0) & (ts_ms <= max_ms)
+    rejected = np.flatnonzero(~valid).tolist()
+
+    hr, temp, ts_ms = hr[valid], temp[valid], ts_ms[valid]
+    device_alert = (records["flags"][valid] & FLAG_DEVICE_ALERT) != 0
+    athlete_ids = records["athlete_id"][valid].astype(np.int64)
+
+    columns = {
+        "athlete_id": np.where(athlete_ids == 0, 1, athlete_ids).tolist(),
+        "heart_rate": hr.tolist(),
+        "temperature": temp.tolist(),
+        # naive UTC datetimes, the health_data convention
+        "timestamp": ts_ms.astype("datetime64[ms]").astype("datetime64[us]").tolist(),
+        # Same thresholds as classify_raw(), plus the device's own alert
+        "is_abnormal": ((hr == 0) | (temp < 30) | (temp > 37.5) | device_alert).tolist(),
+        "alert_message": np.where(device_alert, DEVICE_ALERT_MESSAGE, "OK").tolist(),
+    }
+    return columns, rejected
+
+
+def encode_readings(readings):
+    """
+    Pack (athlete_id, epoch_ms, heart_rate, temperature, flags) tuples in
+    the binary format; the reference for device firmware and tests.
+    """
+    records = np.zeros(len(readings), dtype=READING_DTYPE)
+    for i, (athlete_id, ts, hr, temp, flags) in enumerate(readings):
+        records[i] = (athlete_id, ts, hr, temp, flags, b"")
+    return records.tobytes()
+
+
+# ======================
+# WRITE-BEHIND BUFFER
+# ======================
+def check_row(row):
+    """
+    Verify a storage row (READING_COLUMNS order) fits health_data before
+    it is queued. Raises ValueError/TypeError.
+    """
+    athlete_id, hr, temp, ts, abnormal, alert = row
+    if not isinstance(athlete_id, int):
+        raise TypeError("athlete_id must be an integer")
+    parse_athlete_id(athlete_id)
+    for value, name in ((hr, "heart_rate"), (temp, "temperature")):
+        if value is not None:
+            _finite(value, name)
+    if ts is not None and not isinstance(ts, datetime):
+        raise TypeError("timestamp must be a datetime")
+    if abnormal is not None and not isinstance(abnormal, bool):
+        raise TypeError("is_abnormal must be a boolean")
+    if alert is not None and not isinstance(alert, str):
+        raise TypeError("alert_message must be a string")
+    return row
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-process queue of validated readings, drained by a background
+    thread that writes them in groups with a single commit per group.
+
+    A group is flushed once it holds `batch_size` rows or its oldest row has
+    waited `flush_interval` seconds. Failed writes are retried with the rows
+    kept in order; while they back up, submit() starts refusing new rows so
+    callers can answer 503 instead of growing memory.
+
+    A group that fails `max_attempts` times with one of `data_errors`
+    (errors caused by the rows, not the database being unavailable) is
+    split in halves and retried, so only rows that keep failing on their
+    own are dropped and counted in `dropped_rows`.
+    """
+
+    def __init__(self, flush_fn, max_queue=10000, batch_size=500, flush_interval=0.5, retry_delay=1.0,
+                 max_attempts=3, data_errors=(ValueError, TypeError)):
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.data_errors = data_errors
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "rejected": 0,
+            "invalid": 0,
+            "flushed_rows": 0,
+            "dropped_rows": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def _ensure_started(self):
+        # Started lazily so each gunicorn worker runs its own flusher thread.
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not (self._thread and self._thread.is_alive()):
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="ingest-flusher", daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """
+        Queue one row; False means the buffer is full. A row that would not
+        fit health_data raises ValueError/TypeError instead of being queued.
+        """
+        try:
+            check_row(row)
+        except (ValueError, TypeError):
+            self._count("invalid")
+            raise
+
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self._count("rejected")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _take_group(self):
+        try:
+            first = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+
+        group = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(group) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set():
+                break
+            try:
+                group.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return group
+
+    def _drain_group(self):
+        group = []
+        while len(group) < self.batch_size:
+            try:
+                group.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _flush(self, group):
+        """Write one group; returns None on success, else the error."""
+        started = time.perf_counter()
+        try:
+            error = None if self.flush_fn(group) is not False else RuntimeError("database unavailable")
+        except Exception as e:
+            print("❌ Write-behind flush error:", e)
+            error = e
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            if error is None:
+                self._stats["flushes"] += 1
+                self._stats["flushed_rows"] += len(group)
+                self._stats["last_flush_ms"] = round(elapsed_ms, 3)
+                self._stats["total_flush_ms"] += elapsed_ms
+                self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], elapsed_ms), 3)
+            else:
+                self._stats["failed_flushes"] += 1
+        return error
+
+    def _write(self, group, draining=False):
+        """
+        Flush `group` until it is stored or dropped. Returns the rows left
+        unwritten when stop() interrupts the retries. While draining,
+        unavailable-database errors are also given up after max_attempts.
+        """
+        attempts = 0
+        while True:
+            error = self._flush(group)
+            if error is None:
+                return []
+
+            attempts += 1
+            bad_data = isinstance(error, self.data_errors)
+            if attempts >= self.max_attempts and bad_data and len(group) > 1:
+                half = len(group) // 2
+                pending = self._write(group[:half], draining)
+                return pending + group[half:] if pending else self._write(group[half:], draining)
+            if attempts >= self.max_attempts and (bad_data or draining):
+                print(f"❌ Write-behind dropped {len(group)} reading(s):", error)
+                self._count("dropped_rows", len(group))
+                return []
+
+            if draining:
+                continue
+            if self._stop.wait(self.retry_delay):
+                return group
+
+    def _run(self):
+        while not self._stop.is_set():
+            group = self._take_group()
+            pending = self._write(group) if group else []
+            if pending:
+                self._drain(pending)
+                return
+        self._drain()
+
+    def _drain(self, pending=None):
+        group = pending or self._drain_group()
+        while group:
+            self._write(group, draining=True)
+            group = self._drain_group()
+
+    def stop(self, timeout=10):
+        """Stop the flusher and write out whatever is still queued."""
+        self._stop.set()
+        thread = self._thread
+        if thread and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        else:
+            self._drain()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        flushes = stats.pop("total_flush_ms")
+        stats["avg_flush_ms"] = round(flushes / stats["flushes"], 3) if stats["flushes"] else 0.0
+        stats["queue_depth"] = self.queue.qsize()
+        stats["queue_capacity"] = self.queue.maxsize
+        return stats
@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import tempfile
+import threading
+from functools import wraps
+
+# Each worker snapshots its metrics here and /metrics sums every file.
+# Like prometheus_client's multiprocess directory, clear it on deploy.
+METRICS_DIR = os.environ.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "athlete-metrics")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") not in ("0", "false", "no")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+# ======================
+# METRIC TYPES
+# ======================
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            values = [[list(key), self._copy(value)] for key, value in self._values.items()]
+        return {"type": self.kind, "help": self.help, "labels": list(self.labels), "values": values}
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Per-worker level; worker values are summed on aggregation."""
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        # Per-bucket (not cumulative) counts; the last slot is +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+    @staticmethod
+    def _copy(value):
+        return {"counts": list(value[0]), "sum": value[1]}
+
+    def time(self, *labels):
+        """Decorator recording each call's duration under `labels`."""
+        def decorator(fn):
+            if not METRICS_ENABLED:
+                return fn
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, *labels)
+            return wrapper
+        return decorator
+
+
+# ======================
+# REGISTRY
+# ======================
+_registry = {}
+_collectors = []
+
+
+def _register(metric):
+    return _registry.setdefault(metric.name, metric)
+
+
+def counter(name, help, labels=()):
+    return _register(Counter(name, help, labels))
+
+
+def gauge(name, help, labels=()):
+    return _register(Gauge(name, help, labels))
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help, labels, buckets))
+
+
+def register_collector(fn):
+    """Call `fn()` before each snapshot, e.g. to refresh gauges."""
+    _collectors.append(fn)
+
+
+# Shared metrics, recorded across the app and utils
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests served", ("route", "method", "status"))
+HTTP_LATENCY = histogram("http_request_duration_seconds", "Time to build a response", ("route", "method"))
+DB_LATENCY = histogram("db_call_duration_seconds", "Duration of database helper calls", ("function",))
+MODEL_LATENCY = histogram("model_inference_duration_seconds", "Health model inference time", ("method",))
+INGEST_ROWS = counter("ingest_rows_total", "Readings stored")
+
+
+def db_timed(fn):
+    """Time a database helper under its function name."""
+    return DB_LATENCY.time(fn.__name__)(fn)
+
+
+# ======================
+# SNAPSHOTS (PER WORKER)
+# ======================
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def snapshot():
+    for collect in _collectors:
+        try:
+            collect()
+        except Exception as e:
+            print("❌ Metrics collector error:", e)
+    return {name: metric.snapshot() for name, metric in _registry.items()}
+
+
+def write_snapshot():
+    """Atomically replace this worker's snapshot file."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"worker-{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"pid": os.getpid(), "written": time.time(), "metrics": snapshot()}, f)
+    os.replace(tmp, path)
+
+
+def _write_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            write_snapshot()
+        except Exception as e:
+            print("❌ Metrics snapshot error:", e)
+
+
+def start_writer():
+    """Start this worker's snapshot thread (idempotent, fork-aware)."""
+    global _writer_pid
+    if not METRICS_ENABLED or _writer_pid == os.getpid():
+        return
+    with _writer_lock:
+        if _writer_pid != os.getpid():
+            _writer_pid = os.getpid()
+            threading.Thread(target=_write_loop, name="metrics-writer", daemon=True).start()
+            atexit.register(write_snapshot)
+
+
+# ======================
+# AGGREGATION / EXPOSITION
+# ======================
+def _merge(total, name, metric):
+    merged = total.setdefault(name, {**metric, "values": {}})
+    for labels, value in metric["values"]:
+        key = tuple(labels)
+        if metric["type"] == "histogram":
+            current = merged["values"].setdefault(key, {"counts": [0] * len(value["counts"]), "sum": 0.0})
+            current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+            current["sum"] += value["sum"]
+        else:
+            merged["values"][key] = merged["values"].get(key, 0) + value
+
+
+def aggregate():
+    """
+    Sum every worker's snapshot. Files of exited workers are kept so
+    counters never go backwards; gauges are only taken from workers that
+    are still alive.
+    """
+    write_snapshot()
+    total = {}
+    for entry in os.scandir(METRICS_DIR):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        alive = _alive(data.get("pid"))
+        for name, metric in data["metrics"].items():
+            if metric["type"] == "gauge" and not alive:
+                continue
+            _merge(total, name, metric)
+    return total
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_prometheus(total=None):
+    """Prometheus text exposition (format 0.0.4) of the aggregated metrics."""
+    total = aggregate() if total is None else total
+    lines = []
+    for name, metric in sorted(total.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labels"]
+        for key, value in sorted(metric["values"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {value}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + ["+Inf"], value["counts"]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, key)} {value['sum']}")
+            lines.append(f"{name}_count{_labels(names, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
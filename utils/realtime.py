@@ -0,0 +1,347 @@
+import os
+import json
+import time
+import queue
+import threading
+from decimal import Decimal
+from datetime import datetime, timezone
+
+import psycopg
+
+from utils.db_pool import DATABASE_URL, DB_SSLMODE
+from utils.db_utils import NOTIFY_CHANNEL, LOCAL_TZ
+
+# Philippine time, as served by the REST endpoints
+LOCAL_OFFSET = LOCAL_TZ.utcoffset(None)
+
+
+def reading_from_notify(payload):
+    """
+    Decode a NOTIFY payload: a health_data row as JSON whose alert_message
+    is cut to NOTIFY_ALERT_CHARS (see _insert_columns()).
+    """
+    row = json.loads(payload)
+    utc_ts = datetime.fromisoformat(row["timestamp"])
+    return {
+        "id": row["id"],
+        "athlete_id": row["athlete_id"],
+        "heart_rate": row["heart_rate"],
+        "temperature": row["temperature"],
+        "is_abnormal": bool(row["is_abnormal"]),
+        "alert_message": row.get("alert_message"),
+        "timestamp": (utc_ts + LOCAL_OFFSET).isoformat(),
+        "utc_timestamp": utc_ts,
+    }
+
+
+def public_reading(reading):
+    """The reading as API clients see it (same fields as /api/latest-data)."""
+    return {k: v for k, v in reading.items() if k not in ("athlete_id", "utc_timestamp")}
+
+
+class IngestHub:
+    """
+    In-process fan-out of newly stored readings.
+
+    Each worker keeps one dedicated LISTEN connection. Because every
+    ingest commit NOTIFYs, every worker sees every reading regardless of
+    which worker stored it. Readings are handed to per-athlete subscriber
+    queues (SSE streams) and to registered listener callbacks.
+
+    SSE responses hold their worker thread for the life of the stream, so
+    run gunicorn with a threaded or async worker class
+    (e.g. --worker-class gthread --threads 16) when streaming is used.
+    """
+
+    def __init__(self, channel=NOTIFY_CHANNEL, max_queue=256):
+        self.channel = channel
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self._listeners = []
+        self._reset_listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.connected = False
+        self.received = 0
+        self.dropped = 0
+
+    # ---------- lifecycle ----------
+    def start(self):
+        """Start this worker's LISTEN thread (idempotent, fork-aware)."""
+        if not DATABASE_URL:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._listen, name="ingest-hub", daemon=True)
+            self._thread.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                with psycopg.connect(DATABASE_URL, autocommit=True, sslmode=DB_SSLMODE) as conn:
+                    conn.execute(f"LISTEN {self.channel}")
+                    self.connected = True
+                    backoff = 1
+                    # Readings may have been missed while not listening
+                    self._reset()
+                    for notify in conn.notifies():
+                        try:
+                            self.publish(reading_from_notify(notify.payload))
+                        except Exception as e:
+                            print("❌ Ingest hub payload error:", e)
+            except Exception as e:
+                print("❌ Ingest hub connection error:", e)
+            self.connected = False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    # ---------- fan-out ----------
+    def subscribe(self, athlete_id):
+        self.start()
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(athlete_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, athlete_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(athlete_id)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[athlete_id]
+
+    def add_listener(self, callback):
+        """Call `callback(reading)` for every reading seen by this worker."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def add_reset_listener(self, callback):
+        """Call `callback()` whenever listening (re)starts, e.g. to drop caches."""
+        with self._lock:
+            self._reset_listeners.append(callback)
+
+    def _reset(self):
+        with self._lock:
+            callbacks = list(self._reset_listeners)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print("❌ Ingest hub reset error:", e)
+
+    def publish(self, reading):
+        with self._lock:
+            subscribers = list(self._subscribers.get(reading["athlete_id"], ()))
+            listeners = list(self._listeners)
+            self.received += 1
+
+        for q in subscribers:
+            try:
+                q.put_nowait(reading)
+            except queue.Full:
+                # Slow client: drop rather than let one stream grow memory
+                with self._lock:
+                    self.dropped += 1
+
+        for callback in listeners:
+            try:
+                callback(reading)
+            except Exception as e:
+                print("❌ Ingest hub listener error:", e)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "connected": self.connected,
+                "athletes": len(self._subscribers),
+                "streams": sum(len(s) for s in self._subscribers.values()),
+                "received": self.received,
+                "dropped": self.dropped,
+            }
+
+
+class LatestReadings:
+    """
+    Per-athlete latest reading and ingest sequence (highest stored id),
+    kept current from IngestHub notifications and filled from the
+    database on a miss.
+
+    The sequence changes whenever a reading is stored for the athlete,
+    so it doubles as a validator (ETag) for that athlete's history.
+    Entries are only trustworthy while the hub is listening; callers
+    check `hub.connected` and the hub clears the map on every reconnect.
+    """
+
+    def __init__(self, loader, max_size=10000):
+        self.loader = loader
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _merge(self, athlete_id, reading, modified):
+        entry = self._entries.get(athlete_id)
+        if entry is None:
+            if len(self._entries) >= self.max_size:
+                self._entries.pop(next(iter(self._entries)))
+            entry = self._entries[athlete_id] = {"reading": None, "seq": 0, "modified": modified}
+
+        if reading:
+            current = entry["reading"]
+            if current is None or (reading["timestamp"], reading["id"]) >= (current["timestamp"], current["id"]):
+                entry["reading"] = reading
+            if reading["id"] > entry["seq"]:
+                entry["seq"] = reading["id"]
+                entry["modified"] = modified
+        return entry
+
+    def entry(self, athlete_id):
+        """{"reading", "seq", "modified"} for the athlete, loading it on a miss."""
+        with self._lock:
+            entry = self._entries.get(athlete_id)
+            if entry is not None:
+                self.hits += 1
+                return dict(entry)
+            self.misses += 1
+
+        reading = self.loader(athlete_id)
+        with self._lock:
+            # A notification may have landed while loading; keep the newest
+            return dict(self._merge(athlete_id, reading, datetime.now(timezone.utc)))
+
+    def get(self, athlete_id):
+        return self.entry(athlete_id)["reading"]
+
+    def update(self, reading):
+        """IngestHub listener: fold in a newly stored reading."""
+        with self._lock:
+            if reading["athlete_id"] in self._entries:
+                latest = public_reading(reading)
+                # Same numeric type the database path returns
+                for key in ("heart_rate", "temperature"):
+                    if latest[key] is not None:
+                        latest[key] = Decimal(str(latest[key]))
+                self._merge(reading["athlete_id"], latest, datetime.now(timezone.utc))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "athletes": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class TeamOverviews:
+    """
+    Per-team overview (see db_utils.get_team_overview) for coach screens.
+
+    The set-based query runs at most once per `ttl` seconds per team and
+    window; in between, IngestHub notifications patch each member's latest
+    reading in place, so polling coaches are answered from memory and see
+    new readings immediately. Rolling summaries are up to `ttl` old.
+    Like LatestReadings, only use it while the hub is connected.
+    """
+
+    def __init__(self, loader, ttl=15.0, max_size=1000):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}      # (team_id, minutes) -> {"loaded", "athletes": {athlete_id: member}}
+        self._by_athlete = {}   # athlete_id -> set of entry keys
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, team_id, minutes):
+        """Member overviews (list) for the team, reloading when stale; None if unavailable."""
+        key = (team_id, minutes)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry["loaded"] < self.ttl:
+                self.hits += 1
+                return [dict(member) for member in entry["athletes"].values()]
+            self.misses += 1
+
+        athletes = self.loader(team_id, minutes)
+        if athletes is None:
+            return None
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._unindex(key, old)
+            elif len(self._entries) >= self.max_size:
+                oldest = next(iter(self._entries))
+                self._unindex(oldest, self._entries.pop(oldest))
+
+            members = {member["athlete_id"]: member for member in athletes}
+            for athlete_id, member in members.items():
+                # Keep a reading notified while the query ran
+                previous = old and old["athletes"].get(athlete_id)
+                if previous and self._newer(previous["latest"], member["latest"]):
+                    member["latest"] = previous["latest"]
+                self._by_athlete.setdefault(athlete_id, set()).add(key)
+
+            self._entries[key] = {"loaded": time.monotonic(), "athletes": members}
+            return [dict(member) for member in members.values()]
+
+    @staticmethod
+    def _newer(reading, than):
+        if reading is None:
+            return False
+        return than is None or (reading["timestamp"], reading["id"]) > (than["timestamp"], than["id"])
+
+    def _unindex(self, key, entry):
+        for athlete_id in entry["athletes"]:
+            keys = self._by_athlete.get(athlete_id)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_athlete[athlete_id]
+
+    def update(self, reading):
+        """IngestHub listener: patch the athlete's latest reading in every cached team."""
+        with self._lock:
+            keys = self._by_athlete.get(reading["athlete_id"])
+            if not keys:
+                return
+            latest = public_reading(reading)
+            for key in keys:
+                member = self._entries[key]["athletes"][reading["athlete_id"]]
+                if self._newer(latest, member["latest"]):
+                    member["latest"] = latest
+
+    def invalidate(self, team_id):
+        """Drop a team's cached overviews, e.g. after its membership changed."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == team_id]:
+                self._unindex(key, self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_athlete.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "teams": len(self._entries),
+                "athletes": len(self._by_athlete),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }